@@ -0,0 +1,408 @@
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import argparse
+import contextlib
+import platform
+import statistics
+from unittest import mock
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Benchmark Suite
+# ==============================
+# Times the hot paths of all three projects on synthetic data at growing sizes:
+#   nutrition  - calculate_total_nutrition (final project) by catalog and log size
+#   recommend  - recommend_recipes by recipe catalog size and index mode
+#   flask      - POST /recommendation through Flask's test client (cold and cached)
+#   foods      - food-name validation (list scan vs FoodNameIndex) and typo-tolerant suggestions by catalog size
+#   sequences  - group_data + preprocess_sequences vs preprocess_frame, and extract_features (kaggle competition 2)
+#   lightgbm   - LightGBM training and prediction (kaggle competition 1)
+#   compiled   - native vs Treelite/TL2cgen-compiled prediction on 1 and 1000 rows, for the
+#                XGBoost recommender and LightGBM boosters (skipped when tl2cgen is not installed)
+#
+#   python benchmarks/run_benchmarks.py --save baseline        # record benchmarks/baselines/baseline.json
+#   python benchmarks/run_benchmarks.py --compare baseline     # flag cases slower than the baseline
+#   python benchmarks/run_benchmarks.py --filter sequences --quick
+#
+# Each case runs once to warm up, then --repeat samples; the median is reported and compared.
+# --compare exits with status 1 when any case is more than --threshold slower than its baseline.
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+final_project = os.path.join(root, "final project")
+competition_1 = os.path.join(root, "kaggle competition 1")
+competition_2 = os.path.join(root, "kaggle competition 2")
+baseline_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+for path in (final_project, competition_1, competition_2):
+    sys.path.insert(0, path)
+# importing app opens the food log database; keep it out of the final project directory
+os.environ["FOOD_LOG_DB"] = os.path.join(tempfile.mkdtemp(), "user_food_log.db")
+
+nutrient_keys = ["Calories", "Protein", "Fiber", "Fats", "Carbs", "Sugar"]
+
+
+# ==============================
+# Synthetic Data
+# ==============================
+def synthetic_food_catalog(n_foods, seed=0):
+    rng = np.random.default_rng(seed)
+    catalog = pd.DataFrame(rng.uniform(0, 50, (n_foods, len(nutrient_keys))), columns=nutrient_keys)
+    catalog.insert(0, 'Food Name', [f"food_{i}" for i in range(n_foods)])
+    return catalog
+
+
+def synthetic_food_log(food_names, n_entries, seed=1):
+    rng = np.random.default_rng(seed)
+    names = rng.choice(np.asarray(food_names, dtype=object), n_entries)
+    names[::10] = "unknown food"  # some entries are not in the catalog
+    return [{"Food Name": name, "Quantity": float(q)} for name, q in zip(names, rng.uniform(10, 300, n_entries))]
+
+
+# Two-word names built from the words of the real catalog's food names
+def synthetic_food_names(n_foods, seed=0):
+    import analysis
+
+    words = sorted({word for name in analysis.cleaned_food_data['Food Name'] for word in name.split()})
+    rng = np.random.default_rng(seed)
+    names = {}
+    while len(names) < n_foods:
+        for first, second in rng.choice(len(words), (n_foods, 2)):
+            names.setdefault(f"{words[first]} {words[second].lower()}", None)
+    return list(names)[:n_foods]
+
+
+# Entered names: 3/4 from the catalog, the rest with one character dropped (typos)
+def synthetic_food_queries(food_names, n_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    queries = [str(name) for name in rng.choice(np.asarray(food_names, dtype=object), n_queries)]
+    for i in range(0, n_queries, 4):
+        position = rng.integers(len(queries[i]))
+        queries[i] = queries[i][:position] + queries[i][position + 1:]
+    return queries
+
+
+def synthetic_artifact(base, n_recipes, seed=0):
+    from recommendation_artifact import RecommendationArtifact
+
+    rng = np.random.default_rng(seed)
+    features_scaled = rng.uniform(0, 1, (n_recipes, len(nutrient_keys)))
+    arrays = {
+        'recipe_features': features_scaled,
+        'recipe_features_scaled': features_scaled,
+        'all_scores': base.xgboost_model.predict(features_scaled).astype(np.float32),
+        'scaler_min': np.asarray(base.scaler_min),
+        'scaler_scale': np.asarray(base.scaler_scale),
+        'recipe_names': np.array([f"recipe_{i}" for i in range(n_recipes)]),
+        'recipe_image_urls': np.array([f"https://example.com/{i}.jpg" for i in range(n_recipes)]),
+        'recipe_urls': np.array([f"https://example.com/{i}" for i in range(n_recipes)]),
+    }
+    return RecommendationArtifact(base.xgboost_model, arrays)
+
+
+def synthetic_nutrient_needs(n, seed=2):
+    rng = np.random.default_rng(seed)
+    return [dict(zip(nutrient_keys, rng.uniform(-500, 3000, len(nutrient_keys)).tolist())) for _ in range(n)]
+
+
+def synthetic_sequences(n_sequences, mean_length, seed=0):
+    from benchmark_preprocess import synthetic_rows
+    return synthetic_rows(n_sequences, mean_length, seed)
+
+
+def synthetic_tabular(n_rows, n_features=30, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features))
+    y_binary = (X[:, 0] + rng.normal(size=n_rows) > 0).astype(int)
+    y_multiclass = np.digitize(X[:, 1] + X[:, 2], [-1, 1])
+    return X, y_binary, y_multiclass
+
+
+# ==============================
+# Cases
+# ==============================
+# Every case is (name, setup); setup() prepares the data and returns the function to time.
+# Module globals replaced by a case are patched with mock.patch.object(...).start(); time_case
+# undoes them after the case, so later cases and groups see the original objects.
+def nutrition_cases(quick):
+    import analysis
+
+    def setup(n_foods, n_entries):
+        def prepare():
+            catalog = synthetic_food_catalog(n_foods)
+            food_index, nutrient_matrix = analysis.build_food_index(catalog)
+            mock.patch.object(analysis, 'food_index', food_index).start()
+            mock.patch.object(analysis, 'nutrient_matrix', nutrient_matrix).start()
+            log = synthetic_food_log(catalog['Food Name'], n_entries)
+            return lambda: analysis.calculate_total_nutrition(log)
+        return prepare
+
+    for n_foods in ([1000] if quick else [1000, 100000]):
+        for n_entries in ([10, 1000] if quick else [10, 1000, 100000]):
+            yield f"nutrition/calculate_total_nutrition[foods={n_foods},log={n_entries}]", setup(n_foods, n_entries)
+
+
+def recommend_cases(quick):
+    import app
+    import recipe_index
+    from recommendation_artifact import get_artifact
+
+    def setup(n_recipes, mode):
+        def prepare():
+            recipe_index._indexes.clear()  # indexes are cached per artifact id; drop the previous catalog's
+            artifact = synthetic_artifact(get_artifact(), n_recipes)
+            mock.patch.object(app, 'get_artifact', lambda: artifact).start()
+            needs = synthetic_nutrient_needs(50)
+            app.recommend_recipes(needs[0], index_mode=mode)  # build the index outside the timed loop
+            return lambda: [app.recommend_recipes(n, index_mode=mode) for n in needs]
+        return prepare
+
+    for n_recipes in ([1000, 10000] if quick else [1000, 10000, 100000, 1000000]):
+        for mode in ['brute', 'sorted', 'kdtree']:
+            yield f"recommend/recommend_recipes_x50[recipes={n_recipes},index={mode}]", setup(n_recipes, mode)
+
+
+def flask_cases(quick):
+    import app
+    import analysis
+    from food_log_store import FoodLogStore
+    from response_cache import ResponseCache
+
+    def setup(cached):
+        def prepare():
+            # real food catalog and recipe artifact, with a 20-entry day in a throwaway log database
+            store = FoodLogStore(os.path.join(tempfile.mkdtemp(), "bench.db"), legacy_csv=None)
+            mock.patch.object(app, 'food_log_store', store).start()
+            mock.patch.object(app, 'recommendation_cache', ResponseCache()).start()
+            log = synthetic_food_log(analysis.cleaned_food_data['Food Name'], 20)
+            app.food_log_store.append("2024-12-22", [e["Food Name"] for e in log], [e["Quantity"] for e in log])
+            client = app.app.test_client()
+            payload = {"analysis_date": "2024-12-22", "tdee": 2000, "goal": "maintain"}
+
+            def run():
+                if not cached:
+                    app.recommendation_cache.invalidate()
+                response = client.post('/recommendation', json=payload)
+                assert response.status_code == 200, response.get_json()
+            return run
+        return prepare
+
+    yield "flask/recommendation[cold]", setup(False)
+    yield "flask/recommendation[cached]", setup(True)
+
+
+def food_cases(quick):
+    from food_name_index import FoodNameIndex
+
+    def setup(n_foods, method):
+        def prepare():
+            names = synthetic_food_names(n_foods)
+            queries = synthetic_food_queries(names, 20)
+            if method == 'list':
+                # the frontend's original check: a list of names and a linear `in` per entered name
+                return lambda: [name for name in queries if name not in names]
+            index = FoodNameIndex(names)
+            if method == 'index':
+                return lambda: index.validate(queries, 0)
+            return lambda: [index.suggest(name) for name in queries]
+        return prepare
+
+    for n_foods in ([1000, 100000] if quick else [1000, 100000, 1000000]):
+        for method in ['list', 'index', 'suggest']:
+            yield f"foods/{method}_x20[foods={n_foods}]", setup(n_foods, method)
+
+
+def sequence_cases(quick):
+    from sequence_data import group_data, preprocess_sequences, preprocess_frame
+    from swing_features import extract_frame
+
+    def setup(n_sequences, vectorized):
+        def prepare():
+            frame = synthetic_sequences(n_sequences, 30)
+            if vectorized:
+                return lambda: preprocess_frame(frame, 30)
+            return lambda: preprocess_sequences(group_data(frame), 30)
+        return prepare
+
+    def features_setup(n_sequences):
+        def prepare():
+            frame = synthetic_sequences(n_sequences, 30)
+            return lambda: extract_frame(frame)
+        return prepare
+
+    for n_sequences in ([1000, 10000] if quick else [1000, 10000, 100000]):
+        if n_sequences <= 10000:
+            yield f"sequences/group_data+preprocess_sequences[n={n_sequences}]", setup(n_sequences, False)
+        yield f"sequences/preprocess_frame[n={n_sequences}]", setup(n_sequences, True)
+        yield f"sequences/extract_features[n={n_sequences}]", features_setup(n_sequences)
+
+
+def lightgbm_cases(quick):
+    import lightgbm as lgb
+    from first_kaggle import params_binary, params_multiclass
+    from lgb_training import train_targets
+
+    def train_setup(n_rows):
+        def prepare():
+            X, y_binary, y_multiclass = synthetic_tabular(n_rows)
+            targets = {'binary': (y_binary, dict(params_binary, verbose=-1)),
+                       'multiclass': (y_multiclass, dict(params_multiclass, verbose=-1))}
+
+            def run():
+                with contextlib.redirect_stdout(io.StringIO()):  # train_targets logs every target
+                    train_targets(X, targets, num_boost_round=100)
+            return run
+        return prepare
+
+    def predict_setup(n_rows):
+        def prepare():
+            X, y_binary, _ = synthetic_tabular(5000)
+            booster = lgb.train(dict(params_binary, verbose=-1), lgb.Dataset(X, label=y_binary), num_boost_round=800)
+            X_test, _, _ = synthetic_tabular(n_rows, seed=1)
+            return lambda: booster.predict(X_test)
+        return prepare
+
+    for n_rows in ([5000] if quick else [5000, 50000]):
+        yield f"lightgbm/train_targets_100_rounds[rows={n_rows}]", train_setup(n_rows)
+    for n_rows in ([10000] if quick else [10000, 100000]):
+        yield f"lightgbm/predict_800_rounds[rows={n_rows}]", predict_setup(n_rows)
+
+
+def compiled_cases(quick):
+    try:
+        import tl2cgen  # noqa: F401
+    except ImportError:
+        print("compiled: treelite/tl2cgen not installed, skipping")
+        return
+    import lightgbm as lgb
+    from first_kaggle import params_binary, params_multiclass
+    from compiled_backend import compile_booster, CompiledBooster
+    from compiled_model import compile_xgboost, CompiledPredictor
+    from recommendation_artifact import get_artifact
+
+    compiled = {}  # compile each model once; every library gets its own path (dlopen caches by path)
+
+    def model(kind):
+        if kind not in compiled:
+            libpath = os.path.join(tempfile.mkdtemp(), f"{kind}.so")
+            with contextlib.redirect_stdout(io.StringIO()):  # compiler progress messages
+                if kind == 'xgboost':
+                    native = get_artifact().xgboost_model
+                    compile_xgboost(native, libpath)
+                    compiled[kind] = (native, CompiledPredictor(libpath))
+                else:
+                    params, y = (params_binary, 0) if kind == 'lightgbm_binary' else (params_multiclass, 1)
+                    X, *labels = synthetic_tabular(5000)
+                    native = lgb.train(dict(params, verbose=-1), lgb.Dataset(X, label=labels[y]), num_boost_round=800)
+                    compile_booster(native, libpath)
+                    compiled[kind] = (native, CompiledBooster(libpath))
+        return compiled[kind]
+
+    def setup(kind, backend, n_rows):
+        def prepare():
+            native, compiled_model = model(kind)
+            if kind == 'xgboost':
+                X = np.random.default_rng(1).uniform(0, 1, (n_rows, len(nutrient_keys)))
+            else:
+                X, _, _ = synthetic_tabular(n_rows, seed=1)
+            predictor = native if backend == 'native' else compiled_model
+            return lambda: predictor.predict(X)
+        return prepare
+
+    kinds = ['xgboost', 'lightgbm_binary'] if quick else ['xgboost', 'lightgbm_binary', 'lightgbm_multiclass']
+    for kind in kinds:
+        for n_rows in [1, 1000]:
+            for backend in ['native', 'compiled']:
+                yield f"compiled/{kind}_predict[rows={n_rows},backend={backend}]", setup(kind, backend, n_rows)
+
+
+groups = {
+    'nutrition': nutrition_cases,
+    'recommend': recommend_cases,
+    'flask': flask_cases,
+    'foods': food_cases,
+    'sequences': sequence_cases,
+    'lightgbm': lightgbm_cases,
+    'compiled': compiled_cases,
+}
+
+
+# ==============================
+# Runner
+# ==============================
+# Fast cases are looped until one sample takes at least min_time, so timer noise stays small;
+# times are reported per call.
+def time_case(prepare, repeat, min_time=0.05):
+    try:
+        run = prepare()
+        start = time.perf_counter()
+        run()  # warm-up
+        loops = max(1, int(min_time / max(time.perf_counter() - start, 1e-9)))
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(loops):
+                run()
+            times.append((time.perf_counter() - start) / loops)
+    finally:
+        mock.patch.stopall()  # restore the globals patched by prepare()
+    return statistics.median(times), min(times)
+
+
+def load_baseline(name):
+    with open(os.path.join(baseline_dir, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def save_baseline(name, results):
+    os.makedirs(baseline_dir, exist_ok=True)
+    path = os.path.join(baseline_dir, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump({
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "results": results,
+        }, f, indent=2)
+    print(f"\nBaseline saved to {path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--filter', nargs='+', default=None, help="only run cases whose name contains one of these")
+    parser.add_argument('--quick', action='store_true', help="smaller sizes only")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--save', metavar='NAME', help="save results as benchmarks/baselines/NAME.json")
+    parser.add_argument('--compare', metavar='NAME', help="compare against benchmarks/baselines/NAME.json")
+    parser.add_argument('--threshold', type=float, default=0.2, help="flag cases this much slower than the baseline")
+    args = parser.parse_args()
+
+    os.chdir(final_project)  # the final project loads its CSVs and model relative to its directory
+    baseline = load_baseline(args.compare)["results"] if args.compare else {}
+
+    results, regressions = {}, []
+    print(f"{'case':<72} {'median (ms)':>12} {'min (ms)':>10} {'baseline':>10} {'ratio':>7}")
+    for group, cases in groups.items():
+        for name, prepare in cases(args.quick):
+            if args.filter and not any(pattern in name for pattern in args.filter):
+                continue
+            median, fastest = time_case(prepare, args.repeat)
+            results[name] = {"median": median, "min": fastest}
+
+            line = f"{name:<72} {median * 1000:>12.3f} {fastest * 1000:>10.3f}"
+            if name in baseline:
+                ratio = median / baseline[name]["median"]
+                line += f" {baseline[name]['median'] * 1000:>10.3f} {ratio:>6.2f}x"
+                if ratio > 1 + args.threshold:
+                    regressions.append(name)
+                    line += "  REGRESSION"
+            print(line)
+
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} against '{args.compare}'")
+        for name in regressions:
+            print(f"  {name}")
+        sys.exit(1 if regressions else 0)
@@ -1,19 +1,24 @@
 import pandas as pd
-import pickle
-import os
+import numpy as np
+from functools import lru_cache
 
-# 載入模型和數據
-model_path = "xgboost_recommendation_model.pkl"
-recipes_path = "processed_recipes.csv"
+# 載入食物營養數據
+# （推薦模型與菜餚資料不在此載入，需要時透過 recommendation_artifact.get_artifact() 共用）
 food_data_path = "cleaned_food_data.csv"
 cleaned_food_data = pd.read_csv(food_data_path)
 
-if os.path.exists(model_path) and os.path.exists(recipes_path):
-    with open(model_path, 'rb') as f:
-        xgboost_model = pickle.load(f)
-    recipes_df = pd.read_csv(recipes_path)
-else:
-    raise FileNotFoundError("模型或推薦菜餚數據檔案未找到！")
+# 營養素欄位順序（與 calculate_total_nutrition 回傳的 dict 順序一致）
+nutrient_columns = ["Calories", "Protein", "Fiber", "Fats", "Carbs", "Sugar"]
+
+# 建立食物索引：食物名稱 → 列號 的 hash，以及連續記憶體的營養素矩陣
+def build_food_index(food_data):
+    food_index = {}
+    for row_id, name in enumerate(food_data['Food Name']):
+        food_index.setdefault(name, row_id)  # 與原本相同，只取第一筆匹配
+    nutrient_matrix = np.ascontiguousarray(food_data[nutrient_columns].to_numpy(dtype=np.float64))
+    return food_index, nutrient_matrix
+
+food_index, nutrient_matrix = build_food_index(cleaned_food_data)
 
 base_dri = {
     'Calories': 2000,
@@ -24,14 +29,16 @@ base_dri = {
     'Sugar': 50
 }
 
-# 計算 BMR
+# 計算 BMR（純函數，結果可快取）
+@lru_cache(maxsize=1024)
 def calculate_bmr(weight, height, age, gender):
     if gender == "男":
         return (13.7 * weight) + (5.0 * height) - (6.8 * age) + 66
     else:
         return (9.6 * weight) + (1.8 * height) - (4.7 * age) + 655
 
-# 計算 TDEE
+# 計算 TDEE（純函數，結果可快取）
+@lru_cache(maxsize=1024)
 def calculate_tdee(bmr, activity_level):
     activity_factor = {
         "無活動（久坐）": 1.2,
@@ -42,74 +49,156 @@ def calculate_tdee(bmr, activity_level):
     }
     return bmr * activity_factor.get(activity_level, 1.2)
 
-# 生成健康建議
-def generate_optimized_suggestions(input_foods, tdee, health_goal):
-    # 調整後的每日推薦攝取量 (DRI)
-    goal_factor = {'weight_loss': 0.8, 'maintain': 1.0, 'muscle_gain': 1.2}
-    
-    adjusted_dri = {k: v * (tdee / 2000) * goal_factor[health_goal] for k, v in base_dri.items()}
-    
-    # 計算營養結果
-    total_nutrition = calculate_total_nutrition(input_foods)
+# 健康目標對應的 DRI 倍率
+goal_factor = {'weight_loss': 0.8, 'maintain': 1.0, 'muscle_gain': 1.2}
+
+# 與 nutrient_columns 順序相同的 DRI 向量
+base_dri_vector = np.array([base_dri[nutrient] for nutrient in nutrient_columns], dtype=np.float64)
+
+
+# 各目標調整後的 DRI：(目標數, 6)，欄位順序同 nutrient_columns
+def adjusted_dri_matrix(tdee, goals):
+    factors = np.array([goal_factor[goal] for goal in goals], dtype=np.float64)
+    return base_dri_vector * (tdee / 2000) * factors[:, None]
+
+
+# 單日營養分析：攝取總量只計算一次，調整後的 DRI 與差距以 (目標數, 6) 的矩陣一次算出，
+# 同一份飲食紀錄可同時取得多個健康目標的建議與剩餘營養需求，不需重新計算。
+class NutritionAnalysis:
+    def __init__(self, input_foods, tdee, goals=('maintain',)):
+        self.goals = [goals] if isinstance(goals, str) else list(goals)
+        self.tdee = tdee
+        self.totals, self.matched = total_nutrition_vector(input_foods)
+
+        self.adjusted_dri = adjusted_dri_matrix(tdee, self.goals)
+        self.gaps = self.adjusted_dri - self.totals  # 各目標尚需補充的營養（負值表示超過）
+        self._goal_rows = {goal: row for row, goal in enumerate(self.goals)}
+
+    # 攝取總量（沒有任何食物匹配時與原本相同，回傳整數 0）
+    def total_nutrition(self):
+        if not self.matched:
+            return {nutrient: 0 for nutrient in nutrient_columns}
+        return dict(zip(nutrient_columns, self.totals))
+
+    def recommended_nutrition(self, goal):
+        return dict(zip(nutrient_columns, self.gaps[self._goal_rows[goal]]))
 
     # 比較攝取量與 DRI，生成建議
-    recommendations = {}
-    for nutrient, value in total_nutrition.items():
-        if value > adjusted_dri[nutrient]:
-            recommendations[nutrient] = f"Your {nutrient} intake is too high ({value:.1f} vs {adjusted_dri[nutrient]:.1f})."
-        elif value < adjusted_dri[nutrient]:
-            recommendations[nutrient] = f"Your {nutrient} intake is too low ({value:.1f} vs {adjusted_dri[nutrient]:.1f})."
-        else:
-            recommendations[nutrient] = f"Your {nutrient} intake is within the recommended range ({value:.1f})."
+    def suggestions(self, goal):
+        dri = self.adjusted_dri[self._goal_rows[goal]]
+        values = self.totals if self.matched else np.zeros(len(nutrient_columns))
+        recommendations = {}
+        for nutrient, value, target, sign in zip(nutrient_columns, values, dri, np.sign(values - dri)):
+            if sign > 0:
+                recommendations[nutrient] = f"Your {nutrient} intake is too high ({value:.1f} vs {target:.1f})."
+            elif sign < 0:
+                recommendations[nutrient] = f"Your {nutrient} intake is too low ({value:.1f} vs {target:.1f})."
+            else:
+                recommendations[nutrient] = f"Your {nutrient} intake is within the recommended range ({value:.1f})."
+        return recommendations
 
-    return recommendations
 
-def calculate_total_nutrition(input_foods):
-    # 查找並合併營養數據
-    food_nutrition = []
+# 生成健康建議
+def generate_optimized_suggestions(input_foods, tdee, health_goal):
+    return NutritionAnalysis(input_foods, tdee, [health_goal]).suggestions(health_goal)
+
+
+# 回傳 (與 nutrient_columns 同順序的總量向量, 是否有任何食物匹配)
+def total_nutrition_vector(input_foods):
+    # 透過食物索引查找列號，找不到的食物直接略過
+    row_ids = []
+    quantities = []
     for food in input_foods:
-        # 從 cleaned_food_data 中查找 Food Name
-        food_info = cleaned_food_data[cleaned_food_data['Food Name'] == food['Food Name']]
-
-        if not food_info.empty:
-            food_info = food_info.iloc[0]  # 取出匹配的第一行數據
-            quantity = food['Quantity']  # 使用 input_foods 中的 Quantity(g)
-            food_nutrition.append({
-                "Food Name": food['Food Name'],
-                "Calories": food_info['Calories'] * quantity / 100,
-                "Protein": food_info['Protein'] * quantity / 100,
-                "Fats": food_info['Fats'] * quantity / 100,
-                "Fiber": food_info['Fiber'] * quantity / 100,
-                "Carbs": food_info['Carbs'] * quantity / 100,
-                "Sugar": food_info['Sugar'] * quantity / 100
-            })
-
-    # 計算總營養
-    total_nutrition = {"Calories": 0, "Protein": 0, "Fiber": 0, "Fats": 0, "Carbs": 0, "Sugar": 0}
-
-    for food in food_nutrition:
-        total_nutrition["Calories"] += food["Calories"]
-        total_nutrition["Protein"] += food["Protein"]
-        total_nutrition["Fats"] += food["Fats"]
-        total_nutrition["Fiber"] += food["Fiber"]
-        total_nutrition["Carbs"] += food["Carbs"]
-        total_nutrition["Sugar"] += food["Sugar"]
-
-    return total_nutrition
+        row_id = food_index.get(food['Food Name'])
+        if row_id is not None:
+            row_ids.append(row_id)
+            quantities.append(food['Quantity'])  # 使用 input_foods 中的 Quantity(g)
 
+    if not row_ids:
+        return np.zeros(len(nutrient_columns)), False
 
-def calculate_recom_nutrition(eat_total, tdee, health_goal):
-    goal_factor = {'weight_loss': 0.8, 'maintain': 1.0, 'muscle_gain': 1.2}
+    # 一次 gather 所有食物的營養素，按份量縮放後加總
+    quantities = np.asarray(quantities, dtype=np.float64)
+    return (nutrient_matrix[row_ids] * quantities[:, None] / 100).sum(axis=0), True
 
-    total_dri = {k: v * (tdee / 2000) * goal_factor[health_goal] for k, v in base_dri.items()}
-    
-    recom_nutrition = {"Calories": 0, "Protein": 0, "Fiber": 0, "Fats": 0, "Carbs": 0, "Sugar": 0}
 
-    recom_nutrition["Calories"] = total_dri["Calories"] - eat_total["Calories"]
-    recom_nutrition["Protein"] = total_dri["Protein"] - eat_total["Protein"]
-    recom_nutrition["Fats"] = total_dri["Fats"] - eat_total["Fats"]
-    recom_nutrition["Fiber"] = total_dri["Fiber"] - eat_total["Fiber"]
-    recom_nutrition["Carbs"] = total_dri["Carbs"] - eat_total["Carbs"]
-    recom_nutrition["Sugar"] = total_dri["Sugar"] - eat_total["Sugar"]
+def calculate_total_nutrition(input_foods):
+    totals, matched = total_nutrition_vector(input_foods)
+    if not matched:
+        return {nutrient: 0 for nutrient in nutrient_columns}
+    return dict(zip(nutrient_columns, totals))
 
-    return recom_nutrition
\ No newline at end of file
+
+def calculate_recom_nutrition(eat_total, tdee, health_goal):
+    total_dri = base_dri_vector * (tdee / 2000) * goal_factor[health_goal]
+    eaten = np.array([eat_total[nutrient] for nutrient in nutrient_columns], dtype=np.float64)
+    return dict(zip(nutrient_columns, total_dri - eaten))
+
+
+# 多日營養分析：區間內的紀錄一次 join 食物索引並依日期加總，
+# 計算量與區間內的紀錄筆數成正比，與天數無關。
+# food_log：FoodLogStore.get_range 的結果（Date、Food Name、Quantity）
+class RangeNutritionAnalysis:
+    def __init__(self, food_log, start_date, end_date, tdee, goal='maintain', window=7):
+        self.dates = pd.date_range(start_date, end_date, freq='D')
+        self.window = window
+        self.goal = goal
+        self.adjusted_dri = adjusted_dri_matrix(tdee, [goal])[0]
+
+        # 找不到的食物略過（與 calculate_total_nutrition 相同）
+        row_ids = food_log['Food Name'].map(food_index)
+        matched = row_ids.notna().to_numpy()
+        day_codes = pd.to_datetime(food_log['Date']).to_numpy()[matched]
+        intake = nutrient_matrix[row_ids[matched].astype(np.int64).to_numpy()] \
+            * food_log['Quantity'].to_numpy(dtype=np.float64)[matched, None] / 100
+
+        # 依日期加總；有紀錄但沒有任何食物匹配的日期總量為 0，沒有紀錄的日期為 NaN
+        logged_days = pd.DatetimeIndex(pd.to_datetime(food_log['Date']).unique())
+        daily = pd.DataFrame(intake, columns=nutrient_columns).groupby(day_codes).sum()
+        daily = daily.reindex(logged_days, fill_value=0.0).reindex(self.dates)
+        self.daily = daily
+        self.logged = daily.notna().all(axis=1)
+        self.gaps = self.adjusted_dri - daily  # 尚需補充的營養（負值表示超過）
+        self.rolling = daily.rolling(window, min_periods=1).mean()  # 只平均有紀錄的日期
+
+    # 每個營養素的趨勢：平均、標準差、最小、最大、每日變化斜率（最小平方法），
+    # 以及高於/低於 DRI 的天數
+    def trend(self):
+        logged = self.daily[self.logged]
+        days = (logged.index - self.dates[0]).days.to_numpy(dtype=np.float64)
+        stats = {}
+        for column, dri in zip(nutrient_columns, self.adjusted_dri):
+            values = logged[column].to_numpy()
+            slope = float(np.polyfit(days, values, 1)[0]) if len(values) >= 2 else 0.0
+            stats[column] = {
+                "mean": float(values.mean()) if len(values) else None,
+                "std": float(values.std()) if len(values) else None,
+                "min": float(values.min()) if len(values) else None,
+                "max": float(values.max()) if len(values) else None,
+                "slope_per_day": slope,
+                "dri": float(dri),
+                "days_above_dri": int((values > dri).sum()),
+                "days_below_dri": int((values < dri).sum()),
+            }
+        return stats
+
+    def to_dict(self):
+        def records(frame, mask=None):
+            rows = frame[mask] if mask is not None else frame.dropna(how='all')
+            return [
+                {"date": day.strftime("%Y-%m-%d"), **{column: float(value) for column, value in zip(nutrient_columns, values)}}
+                for day, values in zip(rows.index, rows.to_numpy())
+            ]
+
+        return {
+            "goal": self.goal,
+            "adjusted_dri": dict(zip(nutrient_columns, self.adjusted_dri.tolist())),
+            "days_requested": len(self.dates),
+            "days_logged": int(self.logged.sum()),
+            "missing_days": [day.strftime("%Y-%m-%d") for day in self.dates[~self.logged.to_numpy()]],
+            "daily_totals": records(self.daily, self.logged),
+            "daily_gaps": records(self.gaps, self.logged),
+            "rolling_window": self.window,
+            "rolling_totals": records(self.rolling),
+            "trend": self.trend(),
+        }
@@ -1,36 +1,62 @@
-from flask import Flask, request, jsonify
+import time
+from flask import Flask, request, jsonify, g, Response
 import pandas as pd
 import os
-import pickle
-from analysis import calculate_bmr, calculate_tdee, generate_optimized_suggestions,calculate_total_nutrition , calculate_recom_nutrition
+from food_log_store import FoodLogStore, default_user, normalize_date
+from analysis import calculate_bmr, calculate_tdee, NutritionAnalysis, RangeNutritionAnalysis
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
-import numpy as np
-from IPython.display import Image, display, HTML
+from recommendation_artifact import get_artifact, features, inference_backends
+from recipe_index import get_recipe_index, index_modes
+from food_name_index import get_food_name_index, default_suggestions
+from response_cache import ResponseCache
+import request_metrics
+from request_metrics import stage, RequestProfiler
 
 app = Flask(__name__)
 
-# 加載推薦模型和菜餚數據
-model_path = "xgboost_recommendation_model.pkl"
-recipes_path = "processed_recipes.csv"
+# 推薦模型、縮放參數與所有菜餚分數來自預先建置的 artifact，
+# 第一次推薦時才載入（見 recommendation_artifact.py）
+
+# 飲食日誌儲存層（第一次啟動時會自動匯入舊的 user_food_log.csv）
+food_log_store = FoodLogStore()
+
+# /recommendation 的回應快取，鍵包含該日飲食日誌的版本，日誌新增後自動失效
+recommendation_cache = ResponseCache()
+
+
+# 每個請求的總延遲；開啟剖析模式時，帶 ?profile=1 或 X-Profile: 1 的請求會被剖析
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.profiler = None
+    if request_metrics.profiling_enabled and (request.args.get('profile') == '1' or request.headers.get('X-Profile') == '1'):
+        g.profiler = RequestProfiler.start(request.endpoint or 'unknown')
+
+
+@app.after_request
+def record_request_time(response):
+    if g.get('profiler') is not None:
+        response.headers['X-Profile-Path'] = g.profiler.stop()
+        g.profiler = None
+    if 'request_start' in g:
+        labels = (request.endpoint or 'unknown', request.method, str(response.status_code))
+        request_metrics.request_duration.observe(labels, time.perf_counter() - g.request_start)
+    return response
 
-# 進行特徵縮放 (使用已經 fit 過的 scaler)
-scaler = MinMaxScaler()
 
-# 檢查模型與資料檔案
-if os.path.exists(model_path) and os.path.exists(recipes_path):
-    with open(model_path, 'rb') as f:
-        xgboost_model = pickle.load(f)
-    recipes_df = pd.read_csv(recipes_path)
+# 未處理的例外不會經過 after_request，確保剖析器仍會停止
+@app.teardown_request
+def stop_profiler(exc):
+    if g.get('profiler') is not None:
+        g.profiler.stop()
+        g.profiler = None
 
-    recipes_df = recipes_df.drop_duplicates(subset='name', keep='first')
-    features = ['Calories_Kcal', 'Carbs_g', 'Fats_g', 'Fiber_g', 'Protein_g', 'Sugars_g']
-    X = recipes_df[features]
-    X_scaled = scaler.fit_transform(X)
-    all_scores = xgboost_model.predict(X_scaled)  # 預測所有餐點分數
 
-else:
-    raise FileNotFoundError("模型或推薦菜餚數據檔案未找到！")
+# 統一的錯誤回應：記錄完整 traceback 與依例外類型分類的錯誤次數，回應格式維持不變
+def error_response(e):
+    app.logger.exception("%s failed", request.endpoint)
+    request_metrics.request_errors.inc((request.endpoint or 'unknown', type(e).__name__))
+    return jsonify({"error": str(e)}), 500
 
 # 路由：計算 BMR 和 TDEE
 @app.route('/calculate', methods=['POST'])
@@ -49,105 +75,231 @@ def calculate():
 
         return jsonify({"BMR": bmr, "TDEE": tdee})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
 
 
-def recommend_recipes(nutrient_needs):
-    # 準備模型輸入，將 nutrient_needs 轉換為 np.array
-    input_features = np.array([[  # 確保順序與模型訓練時相同
+def recommend_recipes(nutrient_needs, index_mode=None):
+    # 單筆推薦走與批次相同的無狀態路徑，不修改共用的 recipes_df
+    return recommend_recipes_batch([nutrient_needs], index_mode=index_mode)[0]
+
+
+# 將多組營養需求轉換為 N×6 的模型輸入矩陣（順序與模型訓練時相同）
+def build_input_features(nutrient_needs_list):
+    return np.array([[
         nutrient_needs["Calories"],   # 熱量
         nutrient_needs["Carbs"],      # 碳水化合物
         nutrient_needs["Fats"],       # 脂肪
         nutrient_needs["Fiber"],      # 纖維
         nutrient_needs["Protein"],    # 蛋白質
         nutrient_needs["Sugar"]       # 糖分
-    ]])
-
-    input_scaled = scaler.transform(input_features)
+    ] for nutrient_needs in nutrient_needs_list], dtype=np.float64).reshape(-1, len(features))
 
-    # 計算與使用者輸入的相似度分數
-    similarity_scores = abs(xgboost_model.predict(input_scaled) - all_scores)
 
-    # 將分數加入到數據集中
-    # 確保 'match_score' 欄位不存在
-    if 'match_score' in recipes_df.columns:
-        recipes_df.drop(columns=['match_score'], inplace=True)
+def recommend_recipes_batch(nutrient_needs_list, k=5, index_mode=None):
+    if not nutrient_needs_list:
+        return []
 
-    # 新增 'match_score' 欄位
-    recipes_df['match_score'] = similarity_scores
-
-    # 找出匹配度最高的 Top 5 菜餚
-    top_5 = recipes_df.nsmallest(5, "match_score")
+    with stage("artifact_load"):
+        artifact = get_artifact()
+        recipe_index = get_recipe_index(artifact, index_mode)
 
+    input_scaled = artifact.scale(build_input_features(nutrient_needs_list))
+    if recipe_index.query_space == 'score':
+        # 一次預測所有使用者的需求分數，依與菜餚分數的差距取 Top k
+        with stage("model_predict"):
+            user_scores = artifact.predict(input_scaled)
+        with stage("top_k"):
+            top_indices = recipe_index.query(user_scores, k)
+    else:
+        # 直接以縮放後的營養素距離取 Top k
+        with stage("top_k"):
+            top_indices = recipe_index.query(input_scaled, k)
 
     # 輸出推薦結果：名稱、圖片和超連結
-    recommended_recipes = []
-
-    for index, row in top_5.iterrows():
-        recipe_info = {
-            "name": row['name'],        # 菜餚名稱
-            "image_url": row['img_src'],  # 菜餚圖片 URL
-            "url": row['url'],           # 完整食譜超連結
-            # "match_score": row['match_score'],           # 完整食譜超連結
-            # "nutrient_needs": nutrient_needs
-        }
-        recommended_recipes.append(recipe_info)
-
-    # 使用 IPython display 輸出推薦結果
-    # print("推薦的 Top 5 菜餚：")
-    # for recipe in recommended_recipes:
-    #     display(HTML(f"<h3>{recipe['name']}</h3>"))   # 顯示菜餚名稱
-    #     display(Image(url=recipe['image_url'], width=300))  # 顯示圖片
-    #     display(HTML(f"<a href='{recipe['url']}' target='_blank'>查看完整食譜</a>"))  # 超連結
-
-    return recommended_recipes
-
+    return [
+        [
+            {
+                "name": str(artifact.recipe_names[i]),
+                "image_url": str(artifact.recipe_image_urls[i]),
+                "url": str(artifact.recipe_urls[i])
+            }
+            for i in row
+        ]
+        for row in top_indices
+    ]
 
 
 # 路由：生成健康建議和推薦菜餚
+# 傳入 "goals": [...] 時，同一份飲食紀錄一次分析多個健康目標，回傳 {"goals": {目標: 結果}}
 @app.route('/recommendation', methods=['POST'])
 def recommendation():
     try:
         data = request.json
-        analysis_date = data['analysis_date']
         tdee = data['tdee']
-        goal = data['goal']
+        goal = tuple(data['goals']) if 'goals' in data else data['goal']
+        user_id = data.get('user_id', default_user)
+        # 日期只解析一次，之後的快取鍵與日誌查詢都使用正規化後的 YYYY-MM-DD
+        day = normalize_date(data['analysis_date'])
+
+        # 相同參數且該日日誌未變動時，直接回傳快取結果；傳入 "cache": false 時略過快取（壓力測試用）
+        # 日誌變動後 log_version 不同，舊版本的快取不會再被查到，交由 LRU/TTL 淘汰（不在未命中時掃描整個快取）
+        use_cache = data.get('cache', True)
+        with stage("cache_lookup"):
+            log_version = food_log_store.version(day, user_id)
+            cache_key = (user_id, day, float(tdee), goal, log_version)
+            cached = recommendation_cache.get(cache_key) if use_cache else None
+        if cached is not None:
+            return jsonify(cached)
+
+        # 依 (使用者, 日期) 索引查詢指定日期的飲食紀錄（取代原本讀取整份 CSV 再依日期篩選）
+        with stage("log_query"):
+            input_foods = food_log_store.get_day(day, user_id)
+
+        if not input_foods:
+            return jsonify({"error": f"No data found for the date {day}."}), 404
+
+        # 攝取總量、調整後 DRI 與差距只計算一次（所有目標共用）
+        goals = list(goal) if isinstance(goal, tuple) else [goal]
+        with stage("calculate_total_nutrition"):
+            analysis = NutritionAnalysis(input_foods, tdee, goals)
 
-        # 加載 CSV 文件中的數據
-        csv_file_path = "user_food_log.csv"
-        if not os.path.exists(csv_file_path):
-            return jsonify({"error": "No food log data found."}), 400
+        # 生成健康建議
+        with stage("generate_optimized_suggestions"):
+            recommendations = {g: analysis.suggestions(g) for g in goals}
+
+        # 根據需求推薦菜餚（所有目標合併成一次模型預測）
+        recipes_per_goal = recommend_recipes_batch([analysis.recommended_nutrition(g) for g in goals])
+        results = {
+            g: {"recommendations": recommendations[g], "recommended_recipes": recipes}
+            for g, recipes in zip(goals, recipes_per_goal)
+        }
 
-        # 讀取用戶輸入的飲食日誌
-        food_log = pd.read_csv(csv_file_path)
-        food_log['Date'] = pd.to_datetime(food_log['Date'])
-        analysis_date = pd.to_datetime(analysis_date)
+        result = {"goals": results} if isinstance(goal, tuple) else results[goal]
+        if use_cache:
+            recommendation_cache.put(cache_key, result)
+        return jsonify(result)
+    except Exception as e:
+        return error_response(e)
 
-        # 篩選指定日期的數據
-        filtered_data = food_log[food_log['Date'] == analysis_date]
+# 路由：批次生成多位使用者/多個日期的健康建議和推薦菜餚
+@app.route('/recommendation/batch', methods=['POST'])
+def recommendation_batch():
+    try:
+        items = request.json['requests']
+
+        results = [None] * len(items)
+        pending = []  # (結果位置, 健康建議, 剩餘營養需求)
+        for position, item in enumerate(items):
+            day = normalize_date(item['analysis_date'])
+            with stage("log_query"):
+                input_foods = food_log_store.get_day(day, item.get('user_id', default_user))
+            if not input_foods:
+                results[position] = {"error": f"No data found for the date {day}."}
+                continue
+
+            with stage("calculate_total_nutrition"):
+                analysis = NutritionAnalysis(input_foods, item['tdee'], [item['goal']])
+            with stage("generate_optimized_suggestions"):
+                recommendations = analysis.suggestions(item['goal'])
+            pending.append((position, recommendations, analysis.recommended_nutrition(item['goal'])))
+
+        # 所有請求合併成一次模型預測
+        recipes_per_item = recommend_recipes_batch([recom_total for _, _, recom_total in pending])
+        for (position, recommendations, _), recommended_recipes in zip(pending, recipes_per_item):
+            results[position] = {
+                "recommendations": recommendations,
+                "recommended_recipes": recommended_recipes
+            }
+
+        return jsonify({"results": results})
+    except Exception as e:
+        return error_response(e)
 
-        if filtered_data.empty:
-            return jsonify({"error": f"No data found for the date {analysis_date.date()}."}), 404
+# 路由：日期區間的每日總量、DRI 差距、移動平均與趨勢（週報/月報一次取得，不需逐日呼叫）
+@app.route('/analytics/range', methods=['POST'])
+def analytics_range():
+    try:
+        data = request.json
+        start_date = pd.to_datetime(data['start_date'])
+        end_date = pd.to_datetime(data['end_date'])
+        if end_date < start_date:
+            return jsonify({"error": "end_date must not be before start_date."}), 400
+
+        with stage("log_range_query"):
+            food_log = food_log_store.get_range(start_date, end_date, data.get('user_id', default_user))
+        with stage("range_analysis"):
+            result = RangeNutritionAnalysis(
+                food_log, start_date, end_date, data['tdee'], data.get('goal', 'maintain'), int(data.get('window', 7))
+            ).to_dict()
+        return jsonify(result)
+    except Exception as e:
+        return error_response(e)
 
-        # 格式化數據為函數所需結構
-        input_foods = filtered_data[['Food Name', 'Quantity']].to_dict(orient='records')
+# 路由：食物名稱查詢
+# GET ?q=名稱&k=5：自動完成與拼字容錯建議；POST {"names": [...], "k": 5}：一次驗證多個名稱
+@app.route('/foods/search', methods=['GET', 'POST'])
+def foods_search():
+    try:
+        with stage("food_index_load"):
+            food_names = get_food_name_index()
+        if request.method == 'GET':
+            query = request.args.get('q')
+            if query is None:
+                return jsonify({"error": "Missing query parameter q."}), 400
+            with stage("food_search"):
+                result = food_names.search(query, int(request.args.get('k', default_suggestions)))
+            return jsonify(result)
 
-        # 生成健康建議
-        recommendations = generate_optimized_suggestions(input_foods, tdee, goal)
-
-        # 根據需求推薦菜餚
-        
-        total_nutrients = calculate_total_nutrition(input_foods)
-        recom_total = calculate_recom_nutrition(total_nutrients, tdee, goal)
-        # recom_total = {"Calories": 0, "Protein": 0, "Carbs": 0, "Fiber": 0, "Fats": 0, "Sugar":0}
-        recommended_recipes = recommend_recipes(recom_total)
-
-        return jsonify({
-            "recommendations": recommendations,
-            "recommended_recipes": recommended_recipes
-        })
+        data = request.json
+        k = int(data.get('k', default_suggestions))
+        with stage("food_search"):
+            results = food_names.validate(data['names'], k)
+        return jsonify({"results": results, "invalid": [r["query"] for r in results if not r["valid"]]})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+# 路由：Prometheus 格式的延遲 histogram 與錯誤次數
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+# 路由：快取命中統計，用於調整快取大小
+@app.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "recommendation": recommendation_cache.stats(),
+        "calculate_bmr": calculate_bmr.cache_info()._asdict(),
+        "calculate_tdee": calculate_tdee.cache_info()._asdict()
+    })
 
 if __name__ == '__main__':
-    app.run(debug=True, port=8080)
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=1, help="大於 1 時以多個行程服務請求")
+    parser.add_argument('--single-threaded', action='store_true', help="關閉多執行緒（除錯用）")
+    parser.add_argument('--index', choices=index_modes, help="菜餚搜尋索引模式（預設 sorted，或環境變數 RECIPE_INDEX）")
+    parser.add_argument('--backend', choices=inference_backends, help="模型推論後端（預設 auto，或環境變數 RECOMMENDER_BACKEND）")
+    parser.add_argument('--profile', action='store_true', help="允許以 ?profile=1 或 X-Profile: 1 剖析單一請求（或環境變數 REQUEST_PROFILING=1）")
+    args = parser.parse_args()
+
+    if args.profile:
+        os.environ["REQUEST_PROFILING"] = "1"
+        request_metrics.profiling_enabled = True
+
+    if args.index:
+        # 多行程模式下子行程會重新匯入 recipe_index，因此也寫入環境變數
+        os.environ["RECIPE_INDEX"] = args.index
+        import recipe_index
+        recipe_index.default_index_mode = args.index
+
+    if args.backend:
+        os.environ["RECOMMENDER_BACKEND"] = args.backend
+        import recommendation_artifact
+        recommendation_artifact.default_backend = args.backend
+
+    if args.workers > 1:
+        app.run(port=args.port, threaded=False, processes=args.workers)
+    else:
+        app.run(debug=True, port=args.port, threaded=not args.single_threaded)
@@ -0,0 +1,58 @@
+import argparse
+import time
+import numpy as np
+from recipe_index import build_recipe_index
+
+# 菜餚索引效能測試：以合成菜餚資料比較各索引模式在不同菜餚數量下的查詢延遲，
+# 並檢查 sorted 與 brute、kdtree/balltree 與 nutrient_brute 的 Top k 是否完全一致。
+#   python benchmark_recipe_index.py --sizes 1000 10000 100000 1000000
+
+reference_mode = {'brute': 'brute', 'sorted': 'brute', 'nutrient_brute': 'nutrient_brute',
+                  'kdtree': 'nutrient_brute', 'balltree': 'nutrient_brute'}
+
+
+def synthetic_catalog(n_recipes, seed=0):
+    rng = np.random.default_rng(seed)
+    # 樹模型輸出的分數是離散值，以四捨五入製造大量同分，檢查同分處理
+    scores = np.round(rng.normal(0.5, 0.2, n_recipes), 3).astype(np.float32)
+    features = rng.uniform(0, 1, (n_recipes, 6))
+    return scores, features
+
+
+def synthetic_queries(n_queries, seed=1):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0.5, 0.3, n_queries).astype(np.float32), rng.uniform(-0.2, 1.2, (n_queries, 6))
+
+
+def time_queries(index, queries, k, batch):
+    start = time.perf_counter()
+    results = [index.query(queries[i:i + batch], k) for i in range(0, len(queries), batch)]
+    elapsed = time.perf_counter() - start
+    return np.vstack(results), elapsed / len(queries)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--modes', nargs='+', default=list(reference_mode))
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--batch', type=int, default=1, help="每次查詢的使用者數量（1 = 單筆請求）")
+    parser.add_argument('--k', type=int, default=5)
+    args = parser.parse_args()
+
+    score_queries, nutrient_queries = synthetic_queries(args.queries)
+    print(f"{'recipes':>10} {'mode':>15} {'build (s)':>10} {'query (ms)':>11} {'exact':>6}")
+    for size in args.sizes:
+        scores, features = synthetic_catalog(size)
+        results = {}
+        for mode in sorted(args.modes, key=lambda m: m != reference_mode[m]):  # 先跑參考模式
+            start = time.perf_counter()
+            index = build_recipe_index(mode, scores, features)
+            build_time = time.perf_counter() - start
+
+            queries = score_queries if index.query_space == 'score' else nutrient_queries
+            results[mode], per_query = time_queries(index, queries, args.k, args.batch)
+
+            reference = None if reference_mode[mode] == mode else results.get(reference_mode[mode])
+            exact = "-" if reference is None else str(np.array_equal(results[mode], reference))
+            print(f"{size:>10} {mode:>15} {build_time:>10.3f} {per_query * 1000:>11.3f} {exact:>6}")
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import datetime
+import argparse
+from contextlib import contextmanager
+import pandas as pd
+
+# 飲食日誌儲存層：以 SQLite 取代不斷增長的 user_food_log.csv
+# - (user_id, date) 建立索引，查詢單日紀錄不需重讀整份日誌
+# - 每次寫入都在單一交易中完成，WAL 模式下前端寫入與後端讀取可同時進行
+# - 第一次開啟時若只有舊的 CSV，會自動匯入（也可用 --migrate 手動匯入），已匯入的列會被記錄，不會重複匯入
+
+db_path = os.environ.get("FOOD_LOG_DB", "user_food_log.db")
+legacy_csv_path = "user_food_log.csv"
+default_user = "default"
+
+
+# 將各種日期格式（2024/12/22、2024-12-22、datetime）統一為 YYYY-MM-DD
+# 常見的 ISO 字串與 date/datetime 物件直接轉換，其他格式才交給 pd.to_datetime（約慢兩個數量級）
+def normalize_date(date):
+    if isinstance(date, datetime.date):  # 包含 datetime 與 pd.Timestamp
+        return date.strftime("%Y-%m-%d")
+    if isinstance(date, str):
+        try:
+            return datetime.date.fromisoformat(date.strip()).isoformat()
+        except ValueError:
+            pass
+    return pd.to_datetime(date).strftime("%Y-%m-%d")
+
+
+class FoodLogStore:
+    def __init__(self, path=db_path, legacy_csv=legacy_csv_path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+        # 建立資料表與第一次自動匯入在同一個寫入交易中完成，多個行程同時開啟新資料庫時只會匯入一次
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS food_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    food_name TEXT NOT NULL,
+                    quantity REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_food_log_user_date ON food_log (user_id, date)")
+            # 已匯入的 CSV 列（來源檔案、使用者、列號），重複匯入時略過
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS csv_imports (
+                    source TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    source_row INTEGER NOT NULL,
+                    PRIMARY KEY (source, user_id, source_row)
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'legacy_csv_checked'").fetchone() is None:
+                # 空的資料庫才匯入；已有資料的舊資料庫在建立時就自動匯入過，只補記已匯入的列
+                is_empty = conn.execute("SELECT 1 FROM food_log LIMIT 1").fetchone() is None
+                if legacy_csv and os.path.exists(legacy_csv):
+                    self._import_csv(conn, legacy_csv, default_user, record_only=not is_empty)
+                conn.execute("INSERT INTO meta (key, value) VALUES ('legacy_csv_checked', '1')")
+
+    # 每次操作使用獨立連線（可跨執行緒/行程），離開時提交交易並關閉
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # 新增一天的飲食紀錄（同一次輸入在單一交易內寫入）
+    def append(self, date, food_names, quantities, user_id=default_user):
+        date = normalize_date(date)
+        rows = [(user_id, date, name, float(qty)) for name, qty in zip(food_names, quantities)]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO food_log (user_id, date, food_name, quantity) VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    # 取得指定日期的飲食紀錄，格式與 calculate_total_nutrition 的 input_foods 相同
+    def get_day(self, date, user_id=default_user):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT food_name, quantity FROM food_log WHERE user_id = ? AND date = ? ORDER BY id",
+                (user_id, normalize_date(date))
+            ).fetchall()
+        return [{"Food Name": name, "Quantity": quantity} for name, quantity in rows]
+
+    # 指定日期紀錄的版本（筆數, 最大 id），新增紀錄後必定改變，可作為快取鍵的一部分
+    def version(self, date, user_id=default_user):
+        with self._connect() as conn:
+            count, max_id = conn.execute(
+                "SELECT COUNT(*), MAX(id) FROM food_log WHERE user_id = ? AND date = ?",
+                (user_id, normalize_date(date))
+            ).fetchone()
+        return count, max_id
+
+    # 取得日期區間內（含頭尾）的所有紀錄，單一查詢走 (user_id, date) 索引
+    # 回傳欄位：Date、Food Name、Quantity，依日期與寫入順序排列
+    def get_range(self, start_date, end_date, user_id=default_user):
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT date, food_name, quantity FROM food_log"
+                " WHERE user_id = ? AND date BETWEEN ? AND ? ORDER BY date, id",
+                (user_id, normalize_date(start_date), normalize_date(end_date))
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['Date', 'Food Name', 'Quantity'])
+
+    # 從舊版 CSV 匯入資料，空白列（,,）會被略過；回傳新匯入的筆數
+    # 已匯入過的列（同一檔案、使用者與列號）不會重複寫入，重複執行 --migrate 是安全的
+    def migrate_csv(self, csv_path, user_id=default_user):
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")  # 檢查與寫入在同一個交易中，避免並行匯入
+            return self._import_csv(conn, csv_path, user_id)
+
+    def _import_csv(self, conn, csv_path, user_id, record_only=False):
+        food_log = pd.read_csv(csv_path).dropna(subset=['Date', 'Food Name', 'Quantity'])
+        source = os.path.realpath(csv_path)
+        imported = {row for (row,) in conn.execute(
+            "SELECT source_row FROM csv_imports WHERE source = ? AND user_id = ?", (source, user_id)
+        )}
+        food_log = food_log[~food_log.index.isin(imported)]
+        if food_log.empty:
+            return 0
+        dates = pd.to_datetime(food_log['Date']).dt.strftime("%Y-%m-%d")
+        rows = list(zip([user_id] * len(food_log), dates, food_log['Food Name'], food_log['Quantity'].astype(float)))
+        if not record_only:
+            conn.executemany(
+                "INSERT INTO food_log (user_id, date, food_name, quantity) VALUES (?, ?, ?, ?)", rows
+            )
+        conn.executemany(
+            "INSERT INTO csv_imports (source, user_id, source_row) VALUES (?, ?, ?)",
+            [(source, user_id, int(row)) for row in food_log.index]
+        )
+        return len(rows)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--db', default=db_path)
+    parser.add_argument('--migrate', metavar='CSV', help="將舊版 CSV 飲食日誌匯入資料庫")
+    args = parser.parse_args()
+
+    store = FoodLogStore(args.db, legacy_csv=None)
+    if args.migrate:
+        print(f"Imported {store.migrate_csv(args.migrate)} rows from {args.migrate} into {args.db}")
@@ -0,0 +1,116 @@
+import math
+import bisect
+import threading
+from collections import defaultdict
+import numpy as np
+
+# 食物名稱索引：驗證使用者輸入的食物名稱，並提供自動完成與拼字容錯建議
+# - 驗證：名稱的 hash set，O(1)，與目錄大小無關（取代每次讀取 CSV 後對 list 做線性 in）
+# - 前綴：正規化（不分大小寫、合併空白）後的名稱排序，二分搜尋，O(log N + k)
+# - 容錯：3-gram 倒排索引，只掃描與查詢共用 3-gram 的名稱，依 Dice 相似度排序
+# 驗證維持原本的精確比對（去除前後空白），因為飲食分析以原始名稱查詢營養素；
+# 大小寫或拼字不同的名稱不算合法，但會出現在建議的第一位。
+
+default_suggestions = 5
+default_min_similarity = 0.3
+
+
+def normalize(name):
+    return " ".join(str(name).casefold().split())
+
+
+# 前後補空白，讓短名稱與字首字尾也有 3-gram
+def name_grams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodNameIndex:
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(names))  # 與 build_food_index 相同，重複名稱只取第一筆
+        self._exact = set(self.names)
+
+        keys = [normalize(name) for name in self.names]
+        self._sorted_ids = np.argsort(np.array(keys, dtype=object), kind='stable')
+        self._sorted_keys = [keys[i] for i in self._sorted_ids]
+
+        postings = defaultdict(list)
+        gram_counts = np.empty(len(keys), dtype=np.int32)
+        for row_id, key in enumerate(keys):
+            grams = name_grams(key)
+            gram_counts[row_id] = len(grams)
+            for gram in grams:
+                postings[gram].append(row_id)
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._gram_counts = gram_counts
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return str(name).strip() in self._exact
+
+    def prefix(self, query, k=default_suggestions):
+        key = normalize(query)
+        if not key:
+            return []
+        start = bisect.bisect_left(self._sorted_keys, key)
+        ids = []
+        for position in range(start, min(start + k, len(self._sorted_keys))):
+            if not self._sorted_keys[position].startswith(key):
+                break
+            ids.append(int(self._sorted_ids[position]))
+        return [self.names[i] for i in ids]
+
+    # 前綴相符的名稱優先（依字母順序），其餘依 3-gram Dice 相似度由高到低，同分時依目錄順序
+    def suggest(self, query, k=default_suggestions, min_similarity=default_min_similarity):
+        key = normalize(query)
+        if not key or k <= 0:
+            return []
+        suggestions = self.prefix(key, k)
+
+        grams = name_grams(key)
+        postings = [self._postings[gram] for gram in grams if gram in self._postings]
+        if postings and len(suggestions) < k:
+            shared = np.bincount(np.concatenate(postings), minlength=len(self.names))
+            # Dice >= min_similarity 需要至少 min_similarity * |q| / (2 - min_similarity) 個共同 3-gram
+            ids = np.flatnonzero(shared >= max(1, math.ceil(min_similarity * len(grams) / (2 - min_similarity))))
+            similarity = 2 * shared[ids] / (len(grams) + self._gram_counts[ids])
+            keep = similarity >= min_similarity
+            ids, similarity = ids[keep], similarity[keep]
+            ranked = ids[np.lexsort((ids, -similarity))][:k + len(suggestions)]
+            seen = set(suggestions)
+            suggestions += [name for name in (self.names[i] for i in ranked) if name not in seen]
+        return suggestions[:k]
+
+    # GET /foods/search 的回應格式
+    def search(self, query, k=default_suggestions):
+        query = str(query).strip()
+        return {"query": query, "valid": query in self._exact, "suggestions": self.suggest(query, k)}
+
+    # POST /foods/search：合法名稱只做 hash 查詢，建議只為無法識別的名稱計算
+    def validate(self, names, k=default_suggestions):
+        results = []
+        for name in names:
+            name = str(name).strip()
+            valid = name in self._exact
+            results.append({"query": name, "valid": valid, "suggestions": [] if valid else self.suggest(name, k)})
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+# 以 analysis.food_index（飲食分析實際使用的名稱）建立並快取索引
+def get_food_name_index():
+    import analysis
+
+    food_index = analysis.food_index
+    key = id(food_index)
+    if key not in _indexes:
+        with _indexes_lock:
+            if key not in _indexes:
+                _indexes.clear()
+                _indexes[key] = FoodNameIndex(food_index)
+    return _indexes[key]
@@ -1,9 +1,8 @@
-import os
 import streamlit as st
 import requests
-import pandas as pd
 import matplotlib.pyplot as plt
 from datetime import datetime
+from food_log_store import FoodLogStore
 
 st.set_page_config(
     page_title="Health and Nutrition Recommendation System",
@@ -11,6 +10,28 @@ st.set_page_config(
     layout="centered"
 )
 
+# 食物名稱查詢由後端的名稱索引處理，相同的查詢在前端快取，不再每次讀取整份 CSV
+@st.cache_data(ttl=600, show_spinner=False)
+def search_food(query, k=5):
+    response = requests.get("http://127.0.0.1:8080/foods/search", params={"q": query, "k": k})
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def validate_foods(names, k=3):
+    response = requests.post("http://127.0.0.1:8080/foods/search", json={"names": list(names), "k": k})
+    response.raise_for_status()
+    return response.json()["results"]
+
+
+# 日誌儲存只在第一次使用時建立（建表、WAL 設定與舊 CSV 檢查），之後的寫入共用同一個物件
+# 每次操作都開啟自己的連線，因此可在 Streamlit 的多個 session 之間共用
+@st.cache_resource(show_spinner=False)
+def get_food_log_store():
+    return FoodLogStore()
+
+
 # 設置應用標題
 st.title("🔥 健康飲食推薦與熱量計算")
 
@@ -54,45 +75,41 @@ st.header("🍴 輸入您的飲食內容")
 # 新增日期欄位，預設為今天日期
 date = st.date_input("日期:", value=datetime.today().date())
 
+# 查詢食物名稱（自動完成與拼字建議）
+food_query = st.text_input("🔍 查詢食物名稱:", placeholder="例如：chick")
+if food_query.strip():
+    try:
+        matches = search_food(food_query.strip())["suggestions"]
+        if matches:
+            st.caption("可用的食物名稱：" + "、".join(matches))
+        else:
+            st.caption("找不到相近的食物名稱。")
+    except requests.RequestException as e:
+        st.warning(f"無法查詢食物名稱: {e}")
+
 food_names = st.text_input("食物名稱（以逗號分隔）:", placeholder="例如：Apple, Chicken Breast")
 quantities = st.text_input("食物數量（以逗號分隔，單位為克）:", placeholder="例如：150, 200")
 
 # ✅新增輸入按鈕
 if st.button("✅輸入"):
     try:
-        # 加載合法食物名稱
-        cleaned_data_path = "cleaned_food_data.csv"
-        if not os.path.exists(cleaned_data_path):
-            st.error("系統無法找到基礎食品數據庫！請聯繫管理員。")
-        else:
-            valid_foods = pd.read_csv(cleaned_data_path)['Food Name'].str.strip().tolist()
-
         # 獲取輸入數據
         input_date = str(date)  # 日期
         input_food_names = [name.strip() for name in food_names.split(",")]  # 食物名稱列表
         input_quantities = [qty.strip() for qty in quantities.split(",")]  # 食物數量列表
 
-        # 檢查食物名稱是否合法
-        invalid_foods = [name for name in input_food_names if name not in valid_foods]
+        # 檢查食物名稱是否合法（後端名稱索引，附上相近名稱的建議）
+        invalid_foods = [
+            result["query"] + (f"（您是不是要找：{'、'.join(result['suggestions'])}）" if result["suggestions"] else "")
+            for result in validate_foods(tuple(input_food_names))
+            if not result["valid"]
+        ]
 
         if invalid_foods:
             st.error(f"以下食物無法識別，請檢查後重新輸入: {', '.join(invalid_foods)}")
         else:
-            # 構建輸入數據的 DataFrame
-            new_data = pd.DataFrame({
-                "Date": [input_date] * len(input_food_names),
-                "Food Name": input_food_names,
-                "Quantity": [int(qty) for qty in input_quantities]
-            })
-
-            # 定義 CSV 文件路徑
-            csv_file_path = "user_food_log.csv"
-
-            # 檢查 CSV 是否存在
-            if not os.path.exists(csv_file_path):
-                new_data.to_csv(csv_file_path, index=False)
-            else:
-                new_data.to_csv(csv_file_path, mode='a', header=False, index=False)
+            # 寫入飲食日誌資料庫（單一交易，可與後端同時讀寫）
+            get_food_log_store().append(input_date, input_food_names, [int(qty) for qty in input_quantities])
 
             st.success("已成功保存輸入的飲食記錄！")
     except Exception as e:
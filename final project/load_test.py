@@ -0,0 +1,79 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# 並行壓力測試：確認多執行緒同時推薦時，結果與逐筆執行完全一致
+#   python load_test.py                       # 直接在行程內呼叫 recommend_recipes
+#   python load_test.py --url http://127.0.0.1:8080 --date 2024-12-22   # 對執行中的服務發送請求
+
+nutrient_keys = ["Calories", "Protein", "Fiber", "Fats", "Carbs", "Sugar"]
+
+
+def random_nutrient_needs(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [dict(zip(nutrient_keys, rng.uniform(-500, 3000, len(nutrient_keys)).tolist())) for _ in range(n)]
+
+
+def run_concurrently(func, payloads, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(func, payloads))
+    return results, time.perf_counter() - start
+
+
+def report(name, expected, actual, elapsed):
+    mismatches = sum(e != a for e, a in zip(expected, actual))
+    print(f"{name}: {len(actual)} requests, {mismatches} mismatches, {len(actual) / elapsed:.1f} req/s")
+    return mismatches
+
+
+def in_process_test(n_requests, threads):
+    from app import recommend_recipes
+
+    payloads = random_nutrient_needs(n_requests)
+    expected = [recommend_recipes(needs) for needs in payloads]
+    actual, elapsed = run_concurrently(recommend_recipes, payloads, threads)
+    return report("recommend_recipes", expected, actual, elapsed)
+
+
+def http_test(url, analysis_date, n_requests, threads):
+    import requests
+
+    # "cache": false 讓兩輪都實際計算；否則逐筆執行時填入的快取會讓並行那一輪全部命中
+    goals = ["weight_loss", "maintain", "muscle_gain"]
+    payloads = [
+        {"analysis_date": analysis_date, "tdee": 1500 + 10 * (i % 100), "goal": goals[i % len(goals)], "cache": False}
+        for i in range(n_requests)
+    ]
+
+    def post(payload):
+        return requests.post(f"{url}/recommendation", json=payload).json()
+
+    def cache_hits():
+        return requests.get(f"{url}/cache/stats").json()["recommendation"]["hits"]
+
+    expected = [post(payload) for payload in payloads]
+    hits = cache_hits()
+    actual, elapsed = run_concurrently(post, payloads, threads)
+    hits = cache_hits() - hits
+    if hits:
+        print(f"/recommendation: {hits} concurrent requests were served from the cache")
+    return report("/recommendation", expected, actual, elapsed) + hits
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', help="服務位址，未指定時在行程內測試")
+    parser.add_argument('--date', default="2024-12-22", help="HTTP 模式使用的分析日期")
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    if args.url:
+        mismatches = http_test(args.url, args.date, args.requests, args.threads)
+    else:
+        mismatches = in_process_test(args.requests, args.threads)
+
+    raise SystemExit(1 if mismatches else 0)
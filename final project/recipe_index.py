@@ -0,0 +1,196 @@
+import os
+import threading
+import numpy as np
+
+# 菜餚搜尋索引：依使用者需求找出最接近的 Top k 菜餚
+# - brute     ：以模型分數做線性掃描（原本的做法）
+# - sorted    ：模型分數排序後二分搜尋，只檢查查詢點附近 2k 筆，O(log R + k)
+# - nutrient_brute / kdtree / balltree：直接以 6 個縮放後營養素的歐氏距離排序
+# 所有模式的排序規則都與 nsmallest(keep='first') 相同：距離由小到大，同分時取索引較小者，
+# 因此 sorted 與 brute、kdtree/balltree 與 nutrient_brute 回傳的 Top k 完全一致。
+
+index_modes = ['brute', 'sorted', 'nutrient_brute', 'kdtree', 'balltree']
+default_index_mode = os.environ.get("RECIPE_INDEX", "sorted")
+
+
+# 對 N×R 的距離矩陣逐列取出最小的 k 個索引
+def top_k_indices(distances, k=5):
+    distances = np.atleast_2d(distances)
+    n_rows, n_items = distances.shape
+    k = min(k, n_items)
+    if k == 0:
+        return np.empty((n_rows, 0), dtype=np.intp)
+
+    candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    candidate_dist = np.take_along_axis(distances, candidates, axis=1)
+    kth = candidate_dist.max(axis=1)
+
+    # 第 k 名有同分時，argpartition 不保證取到索引較小的那筆，需逐列修正
+    tie_rows = np.flatnonzero((distances <= kth[:, None]).sum(axis=1) > k)
+    for row in tie_rows:
+        tied = np.flatnonzero(distances[row] <= kth[row])
+        candidates[row] = tied[np.lexsort((tied, distances[row, tied]))][:k]
+        candidate_dist[row] = distances[row, candidates[row]]
+
+    order = np.lexsort((candidates, candidate_dist), axis=1)
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+# 在候選集合中依 (距離, 索引) 排序取前 k 筆
+def select_k(candidates, distances, k):
+    return candidates[np.lexsort((candidates, distances))][:k]
+
+
+class BruteForceScoreIndex:
+    query_space = 'score'
+
+    def __init__(self, scores):
+        self.scores = np.asarray(scores)
+
+    def query(self, user_scores, k=5):
+        similarity_scores = np.abs(np.asarray(user_scores)[:, None] - self.scores[None, :])
+        return top_k_indices(similarity_scores, k)
+
+
+class SortedScoreIndex:
+    query_space = 'score'
+
+    def __init__(self, scores):
+        self.scores = np.asarray(scores)
+        self.order = np.argsort(self.scores, kind='stable')
+        self.sorted_scores = self.scores[self.order]
+
+    def query(self, user_scores, k=5):
+        user_scores = np.asarray(user_scores, dtype=self.scores.dtype)
+        n_items = len(self.scores)
+        k = min(k, n_items)
+        if k == 0:
+            return np.empty((len(user_scores), 0), dtype=np.intp)
+
+        # 一維最近鄰一定落在插入點左右各 k 筆的範圍內
+        positions = np.searchsorted(self.sorted_scores, user_scores)
+        window = positions[:, None] + np.arange(-k, k)
+        valid = (window >= 0) & (window < n_items)
+        window = np.clip(window, 0, n_items - 1)
+
+        candidates = self.order[window]
+        distances = np.abs(user_scores[:, None] - self.scores[candidates])
+        distances = np.where(valid, distances, np.inf)
+
+        # 視窗內依 (距離, 索引) 排序；無效位置的距離為 inf，排在最後
+        ranked = np.lexsort((candidates, distances), axis=1)[:, :k]
+        result = np.take_along_axis(candidates, ranked, axis=1)
+        kth = np.take_along_axis(distances, ranked, axis=1)[:, -1]
+
+        # 視窗外的鄰居若與第 k 名同分，可能因索引較小而應入選，這些列逐一向外擴展
+        left = positions - k - 1
+        right = positions + k
+        left_tie = (left >= 0) & (np.abs(user_scores - self.sorted_scores[np.clip(left, 0, None)]) <= kth)
+        right_tie = (right < n_items) & (np.abs(user_scores - self.sorted_scores[np.clip(right, None, n_items - 1)]) <= kth)
+        for row in np.flatnonzero(left_tie | right_tie):
+            result[row] = self._expand(user_scores[row], positions[row], kth[row], k)
+        return result
+
+    def _expand(self, user_score, position, kth, k):
+        # 距離在插入點兩側各自單調，二分搜尋出所有距離 <= kth 的範圍
+        def within(i):
+            return abs(user_score - self.sorted_scores[i]) <= kth
+
+        lo, left_bound = 0, max(position - k, 0)
+        while lo < left_bound:
+            mid = (lo + left_bound) // 2
+            if within(mid):
+                left_bound = mid
+            else:
+                lo = mid + 1
+
+        right_bound, hi = min(position + k, len(self.sorted_scores)), len(self.sorted_scores)
+        while right_bound < hi:
+            mid = (right_bound + hi) // 2
+            if within(mid):
+                right_bound = mid + 1
+            else:
+                hi = mid
+
+        candidates = self.order[lo:hi]
+        return select_k(candidates, np.abs(user_score - self.scores[candidates]), k)
+
+
+def nutrient_distances(features, points):
+    return np.sqrt(((features[None, :, :] - points[:, None, :]) ** 2).sum(axis=2))
+
+
+class BruteForceNutrientIndex:
+    query_space = 'nutrient'
+
+    def __init__(self, features):
+        self.features = np.asarray(features, dtype=np.float64)
+
+    def query(self, user_features, k=5):
+        user_features = np.asarray(user_features, dtype=np.float64)
+        if len(user_features) == 0:
+            return np.empty((0, min(k, len(self.features))), dtype=np.intp)
+
+        # 分段計算，避免 N×R×6 的中間矩陣過大
+        step = max(1, (1 << 24) // max(1, self.features.size))
+        chunks = [
+            top_k_indices(nutrient_distances(self.features, user_features[start:start + step]), k)
+            for start in range(0, len(user_features), step)
+        ]
+        return np.vstack(chunks)
+
+
+class TreeNutrientIndex:
+    query_space = 'nutrient'
+
+    def __init__(self, features, kind='kdtree', leaf_size=40):
+        from sklearn.neighbors import KDTree, BallTree
+
+        self.features = np.asarray(features, dtype=np.float64)
+        tree_class = KDTree if kind == 'kdtree' else BallTree
+        self.tree = tree_class(self.features, leaf_size=leaf_size)
+
+    def query(self, user_features, k=5):
+        user_features = np.asarray(user_features, dtype=np.float64)
+        k = min(k, len(self.features))
+        if k == 0 or len(user_features) == 0:
+            return np.empty((len(user_features), k), dtype=np.intp)
+
+        # 先取 k 個近鄰得到第 k 名距離，再以略大的半徑取回所有可能同分的候選，
+        # 用與 brute force 相同的公式重算距離後排序，確保結果完全一致
+        kth = self.tree.query(user_features, k=k)[0][:, -1]
+        radius = kth * (1 + 1e-9) + 1e-12
+        neighbors = self.tree.query_radius(user_features, r=radius)
+
+        result = np.empty((len(user_features), k), dtype=np.intp)
+        for row, candidates in enumerate(neighbors):
+            distances = np.sqrt(((self.features[candidates] - user_features[row]) ** 2).sum(axis=1))
+            result[row] = select_k(candidates.astype(np.intp), distances, k)
+        return result
+
+
+def build_recipe_index(mode, scores, features):
+    if mode == 'brute':
+        return BruteForceScoreIndex(scores)
+    if mode == 'sorted':
+        return SortedScoreIndex(scores)
+    if mode == 'nutrient_brute':
+        return BruteForceNutrientIndex(features)
+    if mode in ('kdtree', 'balltree'):
+        return TreeNutrientIndex(features, kind=mode)
+    raise ValueError(f"未知的索引模式：{mode}（可用：{', '.join(index_modes)}）")
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+# 依模式建立並快取索引（以 artifact 中的菜餚分數與縮放後營養素建立）
+def get_recipe_index(artifact, mode=None):
+    mode = mode or default_index_mode
+    key = (id(artifact), mode)
+    if key not in _indexes:
+        with _indexes_lock:
+            if key not in _indexes:
+                _indexes[key] = build_recipe_index(mode, artifact.all_scores, artifact.recipe_features_scaled)
+    return _indexes[key]
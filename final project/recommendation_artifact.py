@@ -0,0 +1,204 @@
+import os
+import json
+import pickle
+import hashlib
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+# 推薦系統的預先計算產物（artifact）
+# 建置步驟一次完成：去除重複菜餚、fit MinMaxScaler、預測所有菜餚分數，
+# 結果以 .npy 檔案存放，載入時使用 mmap，多個 worker 可共用同一份頁面快取。
+#   python recommendation_artifact.py          # 重新建置 artifact
+#   python recommendation_artifact.py --compile  # 另外編譯模型為共享函式庫（見 compiled_model.py）
+# 若 artifact 不存在，載入時會退回原本的做法（讀取 pickle 與 CSV 後在記憶體中計算）。
+
+artifact_version = 1
+artifact_dir = "recommendation_artifact"
+model_path = "xgboost_recommendation_model.pkl"
+recipes_path = "processed_recipes.csv"
+features = ['Calories_Kcal', 'Carbs_g', 'Fats_g', 'Fiber_g', 'Protein_g', 'Sugars_g']
+recipe_columns = {'name': 'recipe_names', 'img_src': 'recipe_image_urls', 'url': 'recipe_urls'}
+# 推論後端：auto（有編譯好的模型且已安裝 tl2cgen 時使用，否則用原生 XGBoost）、native 或 compiled
+inference_backends = ['auto', 'native', 'compiled']
+default_backend = os.environ.get("RECOMMENDER_BACKEND", "auto")
+compiled_scores_name = "all_scores_compiled.npy"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# 從原始模型與菜餚資料計算 artifact 內容（與原本 app.py 啟動時的流程相同）
+def compute_artifact_arrays(model_path=model_path, recipes_path=recipes_path):
+    from sklearn.preprocessing import MinMaxScaler
+
+    if not (os.path.exists(model_path) and os.path.exists(recipes_path)):
+        raise FileNotFoundError("模型或推薦菜餚數據檔案未找到！")
+
+    with open(model_path, 'rb') as f:
+        xgboost_model = pickle.load(f)
+    recipes_df = pd.read_csv(recipes_path)
+    recipes_df = recipes_df.drop_duplicates(subset='name', keep='first')
+
+    scaler = MinMaxScaler()
+    X_scaled = scaler.fit_transform(recipes_df[features])
+
+    arrays = {
+        'recipe_features': recipes_df[features].to_numpy(dtype=np.float64),
+        'recipe_features_scaled': X_scaled,
+        'all_scores': xgboost_model.predict(X_scaled),  # 預測所有餐點分數
+        'scaler_min': scaler.min_,
+        'scaler_scale': scaler.scale_,
+    }
+    for column, key in recipe_columns.items():
+        arrays[key] = recipes_df[column].fillna('').astype(str).to_numpy(dtype=str)
+    return xgboost_model, arrays
+
+
+def build_artifact(out_dir=artifact_dir, model_path=model_path, recipes_path=recipes_path, compile_model=False):
+    xgboost_model, arrays = compute_artifact_arrays(model_path, recipes_path)
+    os.makedirs(out_dir, exist_ok=True)
+
+    for key, array in arrays.items():
+        np.save(os.path.join(out_dir, f"{key}.npy"), array)
+    # 以 XGBoost 原生 JSON 格式儲存模型，避免 pickle 的版本相容問題
+    xgboost_model.save_model(os.path.join(out_dir, "model.json"))
+
+    meta = {
+        'version': artifact_version,
+        'features': features,
+        'n_recipes': int(len(arrays['all_scores'])),
+        'model_sha256': file_sha256(model_path),
+        'recipes_sha256': file_sha256(recipes_path),
+    }
+    if compile_model:
+        meta.update(compile_artifact_model(xgboost_model, out_dir, arrays['recipe_features_scaled']))
+    with open(os.path.join(out_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# 編譯模型並以所有菜餚特徵與隨機輸入檢查與原生模型的一致性，通過後才寫入 meta
+def compile_artifact_model(xgboost_model, out_dir, recipe_features_scaled):
+    from compiled_model import compile_xgboost, CompiledPredictor, check_parity, compiled_lib_name
+
+    libpath = os.path.join(out_dir, compiled_lib_name)
+    compile_xgboost(xgboost_model, libpath)
+    # 使用者的需求縮放後可能超出 [0, 1]，因此也檢查範圍外的輸入
+    random_inputs = np.random.default_rng(0).uniform(-1, 2, (1000, len(features)))
+    compiled = CompiledPredictor(libpath)
+    max_diff = max(check_parity(xgboost_model, compiled, X) for X in (recipe_features_scaled, random_inputs))
+    # 使用者分數與菜餚分數必須出自同一個模型，否則接近同分的菜餚排名會隨後端改變
+    np.save(os.path.join(out_dir, compiled_scores_name), compiled.predict(recipe_features_scaled))
+    return {'compiled_lib': compiled_lib_name, 'compiled_max_diff': max_diff, 'compiled_scores': compiled_scores_name}
+
+
+class RecommendationArtifact:
+    def __init__(self, xgboost_model, arrays, meta=None, predictor=None):
+        self.xgboost_model = xgboost_model
+        self.predictor = predictor or xgboost_model  # 編譯後的模型或原生 XGBoost，介面同為 predict(X)
+        self.meta = meta or {}
+        for key, array in arrays.items():
+            setattr(self, key, array)
+
+    # 等同於已 fit 的 MinMaxScaler.transform
+    def scale(self, X):
+        return X * self.scaler_scale + self.scaler_min
+
+    # 預測縮放後需求的分數
+    def predict(self, X_scaled):
+        return self.predictor.predict(X_scaled)
+
+    @classmethod
+    def load(cls, path=artifact_dir, backend=None, model_path=model_path, recipes_path=recipes_path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get('version') != artifact_version:
+            raise ValueError(f"artifact 版本不符：{meta.get('version')}（需要 {artifact_version}），請重新建置。")
+        check_sources(meta, model_path, recipes_path)
+
+        keys = ['recipe_features', 'recipe_features_scaled', 'all_scores', 'scaler_min', 'scaler_scale']
+        keys += list(recipe_columns.values())
+        arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode='r') for key in keys}
+
+        import xgboost as xgb  # 延遲匯入，避免拖慢 worker 啟動
+
+        xgboost_model = xgb.XGBRegressor()
+        xgboost_model.load_model(os.path.join(path, "model.json"))
+        predictor = load_predictor(path, meta, backend)
+        if predictor is not None:
+            # 以編譯後的模型服務時，菜餚分數也改用它預測的版本（舊的 artifact 沒有預存時於載入時計算）
+            if 'compiled_scores' in meta:
+                arrays['all_scores'] = np.load(os.path.join(path, meta['compiled_scores']), mmap_mode='r')
+            else:
+                arrays['all_scores'] = predictor.predict(np.asarray(arrays['recipe_features_scaled']))
+        return cls(xgboost_model, arrays, meta, predictor)
+
+    @classmethod
+    def from_sources(cls, model_path=model_path, recipes_path=recipes_path):
+        xgboost_model, arrays = compute_artifact_arrays(model_path, recipes_path)
+        return cls(xgboost_model, arrays, {'version': artifact_version, 'features': features})
+
+
+# 模型或菜餚資料在建置後被修改時，預先計算的分數與菜餚陣列已過期，必須重新建置。
+# 只部署 artifact、沒有原始檔案時無從比對，略過檢查。
+def check_sources(meta, model_path=model_path, recipes_path=recipes_path):
+    for key, source in (('model_sha256', model_path), ('recipes_sha256', recipes_path)):
+        if os.path.exists(source) and meta.get(key) != file_sha256(source):
+            raise ValueError(f"{source} 在 artifact 建置後已變更，請執行 python recommendation_artifact.py 重新建置。")
+
+
+# 依後端設定載入編譯後的模型；回傳 None 時使用原生 XGBoost
+def load_predictor(path, meta, backend=None):
+    backend = backend or default_backend
+    if backend == 'native':
+        return None
+    if 'compiled_lib' not in meta:
+        if backend == 'compiled':
+            raise FileNotFoundError(f"{path} 中沒有編譯後的模型，請以 --compile 重新建置 artifact。")
+        return None
+    try:
+        from compiled_model import CompiledPredictor
+        return CompiledPredictor(os.path.join(path, meta['compiled_lib']))
+    except (ImportError, OSError):
+        # 未安裝 tl2cgen 或函式庫與目前平台不相容
+        if backend == 'compiled':
+            raise
+        return None
+
+
+_artifact = None
+_artifact_lock = threading.Lock()
+
+
+# 第一次使用時才載入，同一行程內的所有模組共用同一份
+def get_artifact():
+    global _artifact
+    if _artifact is None:
+        with _artifact_lock:
+            if _artifact is None:
+                if os.path.exists(os.path.join(artifact_dir, "meta.json")):
+                    _artifact = RecommendationArtifact.load(artifact_dir)
+                else:
+                    _artifact = RecommendationArtifact.from_sources()
+    return _artifact
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--out', default=artifact_dir)
+    parser.add_argument('--model', default=model_path)
+    parser.add_argument('--recipes', default=recipes_path)
+    parser.add_argument('--compile', action='store_true', help="以 Treelite/TL2cgen 編譯模型（需要 treelite、tl2cgen 與 C 編譯器）")
+    args = parser.parse_args()
+
+    meta = build_artifact(args.out, args.model, args.recipes, compile_model=args.compile)
+    print(f"Built artifact v{meta['version']} with {meta['n_recipes']} recipes in {args.out}")
+    if 'compiled_lib' in meta:
+        print(f"Compiled model: {meta['compiled_lib']} (max difference from XGBoost {meta['compiled_max_diff']:.3g})")
@@ -0,0 +1,168 @@
+import os
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 請求延遲量測
+# - stage("名稱")：量測推薦流程中各階段（日誌查詢、健康建議、營養計算、模型預測、Top k …）的耗時
+# - 每個請求的總延遲與錯誤次數在 Flask 的 before/after_request 中記錄
+# - render() 輸出 Prometheus 文字格式，由 /metrics 提供
+# 統計資料存在行程內；以多個行程（--workers）服務時，每個行程各自統計。
+
+# 以秒為單位的 histogram 區間，涵蓋 0.1 ms（單一階段）到 10 s（整個請求）
+default_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=default_buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [各區間次數, 總和, 次數]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (bucket_counts, total, count) in sorted(self._series.items()):
+                label_text = format_labels(self.label_names, labels)
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+                lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{{{format_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+def format_labels(label_names, labels):
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels)
+    return ",".join(f'{name}="{value}"' for name, value in zip(label_names, escaped))
+
+
+request_duration = Histogram("nutrition_request_duration_seconds", "Total request latency", ("endpoint", "method", "status"))
+stage_duration = Histogram("nutrition_stage_duration_seconds", "Time spent in each processing stage", ("stage",))
+request_errors = Counter("nutrition_request_errors_total", "Requests answered with 500, by exception type", ("endpoint", "exception"))
+metrics = [request_duration, stage_duration, request_errors]
+
+
+# 量測一個處理階段的耗時
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe((name,), time.perf_counter() - start)
+
+
+def render():
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==============================
+# 單一請求的效能剖析（需開啟 REQUEST_PROFILING=1 或 app.py --profile）
+# ==============================
+# 帶有 ?profile=1 或 X-Profile: 1 的請求會被剖析，結果存到 profile_dir：
+# 預設使用 cProfile（.prof，可用 snakeviz / pstats 檢視）；
+# 設定 REQUEST_PROFILER=pyinstrument 且已安裝 pyinstrument 時輸出 .html。
+profiling_enabled = os.environ.get("REQUEST_PROFILING") == "1"
+profiler_name = os.environ.get("REQUEST_PROFILER", "cprofile")
+profile_dir = os.environ.get("REQUEST_PROFILE_DIR", "profiles")
+_profile_lock = threading.Lock()  # 同一時間只剖析一個請求（Python 的剖析器無法同時啟動多個）
+
+
+class RequestProfiler:
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.path = None
+        self.stopped = False
+        if profiler_name == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                Profiler = None
+            if Profiler is not None:
+                self.kind, self._profiler = "pyinstrument", Profiler()
+                return
+        import cProfile
+
+        self.kind, self._profiler = "cprofile", cProfile.Profile()
+
+    # 取得剖析鎖才開始；其他請求正在剖析時回傳 None
+    @classmethod
+    def start(cls, endpoint):
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        # 建立或啟動剖析器失敗時釋放鎖，否則之後的請求都無法再剖析
+        try:
+            profiler = cls(endpoint)
+            if profiler.kind == "pyinstrument":
+                profiler._profiler.start()
+            else:
+                profiler._profiler.enable()
+        except BaseException:
+            _profile_lock.release()
+            raise
+        return profiler
+
+    # 可重複呼叫：after_request 中 stop 失敗時 teardown 會再呼叫一次，鎖只釋放一次
+    def stop(self):
+        if self.stopped:
+            return self.path
+        self.stopped = True
+        try:
+            if self.kind == "pyinstrument":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+            os.makedirs(profile_dir, exist_ok=True)
+            base = os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{time.time_ns() % 10**9}-{self.endpoint}")
+            if self.kind == "pyinstrument":
+                self.path = base + ".html"
+                with open(self.path, "w") as f:
+                    f.write(self._profiler.output_html())
+            else:
+                self.path = base + ".prof"
+                self._profiler.dump_stats(self.path)
+        finally:
+            _profile_lock.release()
+        return self.path
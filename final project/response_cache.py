@@ -0,0 +1,70 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+
+# 行程內的 LRU + TTL 回應快取
+# 快取鍵由呼叫端組成（例如 /recommendation 使用 (使用者, 日期, TDEE, 目標, 日誌版本)），
+# 日誌版本在該日新增紀錄後會改變，因此前端寫入後舊的結果不會再被命中。
+
+default_max_size = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+default_ttl = float(os.environ.get("RESPONSE_CACHE_TTL", 300))
+
+
+class ResponseCache:
+    def __init__(self, max_size=default_max_size, ttl=default_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (到期時間, 值)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]  # 已過期
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # 移除符合條件的快取（例如某使用者某日期的所有結果）
+    def invalidate(self, predicate=None):
+        with self._lock:
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                keys = [key for key in self._entries if predicate(key)]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+        return removed
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,99 @@
+import os
+import json
+import hashlib
+import argparse
+import numpy as np
+import lightgbm as lgb
+
+# 編譯後的 LightGBM 推論（選用）
+# 以 Treelite 將 first_kaggle.py 存下的四個模型轉成 C 程式碼，再由 TL2cgen 編譯成共享函式庫，
+# predict.py --backend compiled 會改用編譯後的模型預測，輸出與 Booster.predict 相同。
+#   python compiled_backend.py --model-dir models
+# 需要 pip install treelite tl2cgen 以及 C 編譯器。
+# 編譯時會記錄每個模型檔的 sha256，模型重新訓練後必須重新編譯，否則載入時會報錯。
+
+manifest_name = "compiled.json"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def compile_booster(booster, libpath, toolchain='gcc'):
+    import treelite
+    import tl2cgen
+
+    model = treelite.frontend.from_lightgbm(booster)
+    tl2cgen.export_lib(model, toolchain=toolchain, libpath=libpath, params={'parallel_comp': 8})
+    return libpath
+
+
+class CompiledBooster:
+    def __init__(self, libpath, nthread=1):
+        import tl2cgen
+
+        self._dmatrix = tl2cgen.DMatrix
+        self._predictor = tl2cgen.Predictor(libpath, nthread=nthread)
+
+    # 與 Booster.predict 相同：二元分類回傳 (N,)，多類別回傳 (N, 類別數)
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        predictions = self._predictor.predict(self._dmatrix(X)).reshape(len(X), -1)
+        return predictions[:, 0] if predictions.shape[1] == 1 else predictions
+
+
+# 以標準化後的隨機輸入（含缺值）比對編譯前後的預測
+def check_parity(booster, compiled, n_rows=2000, rtol=1e-5, atol=1e-6, seed=0):
+    X = np.random.default_rng(seed).normal(0, 2, (n_rows, booster.num_feature()))
+    X[::11, ::3] = np.nan
+    expected, actual = booster.predict(X), compiled.predict(X)
+    max_diff = float(np.max(np.abs(actual - expected)))
+    if not np.allclose(actual, expected, rtol=rtol, atol=atol):
+        raise ValueError(f"編譯後的模型與 LightGBM 預測不一致（最大差異 {max_diff:.3g}）")
+    return max_diff
+
+
+def compile_models(model_dir, names, toolchain='gcc'):
+    manifest = {}
+    for name in names:
+        model_path = os.path.join(model_dir, f"{name}.txt")
+        libpath = os.path.join(model_dir, f"{name}.so")
+        booster = lgb.Booster(model_file=model_path)
+        compile_booster(booster, libpath, toolchain)
+        max_diff = check_parity(booster, CompiledBooster(libpath))
+        manifest[name] = {'lib': f"{name}.so", 'model_sha256': file_sha256(model_path), 'max_diff': max_diff}
+        print(f"Compiled {name}: {libpath} (max difference from LightGBM {max_diff:.3g})")
+    with open(os.path.join(model_dir, manifest_name), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_compiled_models(model_dir, names):
+    manifest_path = os.path.join(model_dir, manifest_name)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f"{manifest_path} 不存在，請先執行 python compiled_backend.py --model-dir {model_dir}")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    models = {}
+    for name in names:
+        entry = manifest.get(name)
+        if entry is None or entry['model_sha256'] != file_sha256(os.path.join(model_dir, f"{name}.txt")):
+            raise ValueError(f"{name} 的編譯結果與目前的模型不符，請重新編譯。")
+        models[name] = CompiledBooster(os.path.join(model_dir, entry['lib']))
+    return models
+
+
+if __name__ == '__main__':
+    from predict import target_names
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model-dir', default='models', help="first_kaggle.py 的 --model-dir")
+    parser.add_argument('--toolchain', default='gcc', help="C 編譯器（gcc、clang 或 msvc）")
+    args = parser.parse_args()
+
+    compile_models(args.model_dir, target_names, args.toolchain)
@@ -1,27 +1,9 @@
-import numpy as np
+import os
 import pandas as pd
-from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score
-import lightgbm as lgb
 import xgboost as xgb
-
-train_data = pd.read_csv('train.csv')
-train_data
-train_data.isna().sum()
-X = train_data.drop(columns=['data_ID', 'player_ID', 'gender', 'play years', 'hold racket handed', 'level'])
-y_gender = train_data['gender']
-y_play_years = train_data['play years']
-y_racket_handed = train_data['hold racket handed']
-y_level = train_data['level']
-
-from sklearn.preprocessing import StandardScaler
-scaler = StandardScaler()
-X = scaler.fit_transform(X)
-X_train, X_test, y_train_gender, y_test_gender = train_test_split(X, y_gender, test_size=0.2, random_state=0)
-_, _, y_train_play_years, y_test_play_years = train_test_split(X, y_play_years, test_size=0.2, random_state=0)
-_, _, y_train_racket_handed, y_test_racket_handed = train_test_split(X, y_racket_handed, test_size=0.2, random_state=0)
-_, _, y_train_level, y_test_level = train_test_split(X, y_level, test_size=0.2, random_state=0)
-
+from lgb_training import train_targets
+from preprocessing import Preprocessor, split_indices
 
 params_multiclass = {
     'objective': 'multiclass',
@@ -53,160 +35,203 @@ params_binary = {
 }
 
 
-
-# 訓練 gender 的模型
-lgb_train_gender = lgb.Dataset(X_train, label=y_train_gender)
-model_gender = lgb.train(params_binary, lgb_train_gender, num_boost_round=800)
-
-# 訓練 play years 的模型
-lgb_train_play_years = lgb.Dataset(X_train, label=y_train_play_years)
-model_play_years = lgb.train(params_multiclass, lgb_train_play_years, num_boost_round=800)
-
-# 訓練 hold racket handed 的模型
-lgb_train_racket_handed = lgb.Dataset(X_train, label=y_train_racket_handed)
-model_racket_handed = lgb.train(params_binary, lgb_train_racket_handed, num_boost_round=800)
-
-
-# 訓練 level 的模型
-lgb_train_level = lgb.Dataset(X_train, label=y_train_level)
-model_level = lgb.train(params_multiclass, lgb_train_level, num_boost_round=800)
-
-# 預測 Gender（二分類）
-y_pred_gender = (model_gender.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
-gender_accuracy = accuracy_score(y_test_gender, y_pred_gender)
-gender_precision = precision_score(y_test_gender, y_pred_gender)
-gender_recall = recall_score(y_test_gender, y_pred_gender)
-gender_f1 = f1_score(y_test_gender, y_pred_gender)
-
-# 預測 Play Years（多分類）
-y_pred_play_years = model_play_years.predict(X_test).argmax(axis=1)  # 取機率最高的類別
-play_years_accuracy = accuracy_score(y_test_play_years, y_pred_play_years)
-play_years_precision = precision_score(y_test_play_years, y_pred_play_years, average='macro')
-play_years_recall = recall_score(y_test_play_years, y_pred_play_years, average='macro')
-play_years_f1 = f1_score(y_test_play_years, y_pred_play_years, average='macro')
-
-# 預測 Racket Handed（二分類）
-y_pred_racket_handed = (model_racket_handed.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
-racket_handed_accuracy = accuracy_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_precision = precision_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_recall = recall_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_f1 = f1_score(y_test_racket_handed, y_pred_racket_handed)
-
-# 預測 Level（多分類）
-y_pred_level = model_level.predict(X_test).argmax(axis=1)  # 取機率最高的類別
-level_accuracy = accuracy_score(y_test_level, y_pred_level)
-level_precision = precision_score(y_test_level, y_pred_level, average='macro')
-level_recall = recall_score(y_test_level, y_pred_level, average='macro')
-level_f1 = f1_score(y_test_level, y_pred_level, average='macro')
-
-# 總結各模型的準確率
-print(f"Gender Precision: {gender_precision:.4f}, Recall: {gender_recall:.4f}, F1-Score: {gender_f1:.4f}")
-print(f"Play Years Precision: {play_years_precision:.4f}, Recall: {play_years_recall:.4f}, F1-Score: {play_years_f1:.4f}")
-print(f"Racket Handed Precision: {racket_handed_precision:.4f}, Recall: {racket_handed_recall:.4f}, F1-Score: {racket_handed_f1:.4f}")
-print(f"Level Precision: {level_precision:.4f}, Recall: {level_recall:.4f}, F1-Score: {level_f1:.4f}")
-
-"""
-model_gender_xgb = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss')
-model_gender_xgb.fit(X_train, y_train_gender)
-
-model_racket_handed_xgb = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss')
-model_racket_handed_xgb.fit(X_train, y_train_racket_handed)
-
-model_play_years_xgb = xgb.XGBClassifier(objective='multi:softmax', num_class=3)
-model_play_years_xgb.fit(X_train, y_train_play_years)
-
-model_level_xgb = xgb.XGBClassifier(objective='multi:softmax', num_class=3)
-model_level_xgb.fit(X_train, y_train_level)
-
-# 預測 Gender（二分類）
-y_pred_gender = (model_gender_xgb.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
-gender_accuracy = accuracy_score(y_test_gender, y_pred_gender)
-gender_precision = precision_score(y_test_gender, y_pred_gender)
-gender_recall = recall_score(y_test_gender, y_pred_gender)
-gender_f1 = f1_score(y_test_gender, y_pred_gender)
-
-# 預測 Play Years（多分類）
-y_pred_play_years = model_play_years_xgb.predict(X_test) 
-play_years_accuracy = accuracy_score(y_test_play_years, y_pred_play_years)
-play_years_precision = precision_score(y_test_play_years, y_pred_play_years, average='macro')
-play_years_recall = recall_score(y_test_play_years, y_pred_play_years, average='macro')
-play_years_f1 = f1_score(y_test_play_years, y_pred_play_years, average='macro')
-
-# 預測 Racket Handed（二分類）
-y_pred_racket_handed = (model_racket_handed_xgb.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
-racket_handed_accuracy = accuracy_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_precision = precision_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_recall = recall_score(y_test_racket_handed, y_pred_racket_handed)
-racket_handed_f1 = f1_score(y_test_racket_handed, y_pred_racket_handed)
-
-# 預測 Level（多分類）
-y_pred_level = model_level_xgb.predict(X_test) 
-level_accuracy = accuracy_score(y_test_level, y_pred_level)
-level_precision = precision_score(y_test_level, y_pred_level, average='macro')
-level_recall = recall_score(y_test_level, y_pred_level, average='macro')
-level_f1 = f1_score(y_test_level, y_pred_level, average='macro')
-
-# 總結各模型的準確率
-print(f"Gender Precision: {gender_precision:.4f}, Recall: {gender_recall:.4f}, F1-Score: {gender_f1:.4f}")
-print(f"Play Years Precision: {play_years_precision:.4f}, Recall: {play_years_recall:.4f}, F1-Score: {play_years_f1:.4f}")
-print(f"Racket Handed Precision: {racket_handed_precision:.4f}, Recall: {racket_handed_recall:.4f}, F1-Score: {racket_handed_f1:.4f}")
-print(f"Level Precision: {level_precision:.4f}, Recall: {level_recall:.4f}, F1-Score: {level_f1:.4f}")
-"""
-
-test_data = pd.read_csv('test.csv')
-X = test_data.drop('data_ID', axis=1)
-scaler = StandardScaler()
-X = scaler.fit_transform(X)
-
-# 預測 Gender（二分類）
-y_pred_gender = model_gender.predict(X)
-
-# 預測 Play Years（多分類）
-y_pred_play_years = model_play_years.predict(X)
-
-# 預測 Racket Handed（二分類）
-y_pred_racket_handed = model_racket_handed.predict(X)
-
-# 預測 Level（多分類）
-y_pred_level = model_level.predict(X)
-
-predicted = pd.DataFrame({
-    'data_ID': test_data['data_ID'],
-    'gender': y_pred_gender,
-    'hold racket handed': y_pred_racket_handed,
-    'play years_0': y_pred_play_years[:,0],
-    'play years_1': y_pred_play_years[:,1],
-    'play years_2': y_pred_play_years[:,2],
-    'level_0': y_pred_level[:,0],
-    'level_1': y_pred_level[:,1],
-    'level_2': y_pred_level[:,2],
-})
-
-predicted.to_csv('submission_lgb.csv', index=False)
-"""
-# 預測 Gender（二分類）
-y_pred_gender = model_gender_xgb.predict_proba(X)[:, 1]
-
-# 預測 Play Years（多分類）
-y_pred_play_years = model_play_years_xgb.predict_proba(X)
-
-# 預測 Racket Handed（二分類）
-y_pred_racket_handed = model_racket_handed_xgb.predict_proba(X)[:, 1]
-
-# 預測 Level（多分類）
-y_pred_level = model_level_xgb.predict_proba(X)
-
-predicted = pd.DataFrame({
-    'data_ID': test_data['data_ID'],
-    'gender': y_pred_gender,
-    'hold racket handed': y_pred_racket_handed,
-    'play years_0': y_pred_play_years[:,0],
-    'play years_1': y_pred_play_years[:,1],
-    'play years_2': y_pred_play_years[:,2],
-    'level_0': y_pred_level[:,0],
-    'level_1': y_pred_level[:,1],
-    'level_2': y_pred_level[:,2],
-})
-
-predicted.to_csv('submission_xgb.csv', index=False)
-"""
\ No newline at end of file
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n-jobs', type=int, default=1, help="同時訓練的目標數（process pool）")
+    parser.add_argument('--threads', type=int, default=None, help="所有 worker 共用的執行緒總數（預設為 CPU 核心數）")
+    parser.add_argument('--early-stopping', type=int, default=0, help="驗證集 loss 連續幾輪沒有改善就停止（0 = 固定 800 輪）")
+    parser.add_argument('--checkpoint-dir', default=None, help="定期把各目標的模型存到這個資料夾")
+    parser.add_argument('--checkpoint-every', type=int, default=50)
+    parser.add_argument('--resume', action='store_true', help="從 --checkpoint-dir 的模型接續訓練（例如加入新資料後）")
+    parser.add_argument('--model-dir', default='models', help="訓練好的模型與 scaler 存放位置")
+    args = parser.parse_args()
+
+    train_data = pd.read_csv('train.csv')
+    train_data
+    train_data.isna().sum()
+    y_gender = train_data['gender']
+    y_play_years = train_data['play years']
+    y_racket_handed = train_data['hold racket handed']
+    y_level = train_data['level']
+
+    # scaler 在 train.csv 上 fit 一次並存起來，推論時沿用；所有目標共用同一次 index 切分
+    preprocessor = Preprocessor()
+    X = preprocessor.fit_transform(train_data)
+    train_idx, test_idx = split_indices(len(X), test_size=0.2, random_state=0)
+    # 開啟 --early-stopping 時再從訓練資料切出驗證集挑選輪數，X_test 只用來計算最後的指標
+    valid_idx = train_idx[:0]
+    if args.early_stopping:
+        fit_pos, valid_pos = split_indices(len(train_idx), test_size=0.2, random_state=0)
+        train_idx, valid_idx = train_idx[fit_pos], train_idx[valid_pos]
+    X_train, X_valid, X_test = X[train_idx], X[valid_idx], X[test_idx]
+    y_train_gender, y_test_gender = y_gender.iloc[train_idx], y_gender.iloc[test_idx]
+    y_train_play_years, y_test_play_years = y_play_years.iloc[train_idx], y_play_years.iloc[test_idx]
+    y_train_racket_handed, y_test_racket_handed = y_racket_handed.iloc[train_idx], y_racket_handed.iloc[test_idx]
+    y_train_level, y_test_level = y_level.iloc[train_idx], y_level.iloc[test_idx]
+
+    # 訓練 gender / play years / hold racket handed / level 的模型
+    # 特徵只 bin 一次，四個目標可平行訓練（--n-jobs 4 --threads <總執行緒數>）
+    # 開啟 --early-stopping 時以訓練資料切出來的 X_valid 當驗證集
+    boosters = train_targets(X_train, {
+        'gender': (y_train_gender, params_binary),
+        'play years': (y_train_play_years, params_multiclass),
+        'hold racket handed': (y_train_racket_handed, params_binary),
+        'level': (y_train_level, params_multiclass),
+    }, num_boost_round=800, n_jobs=args.n_jobs, total_threads=args.threads,
+        X_valid=X_valid if args.early_stopping else None,
+        valid_targets={
+            'gender': y_gender.iloc[valid_idx],
+            'play years': y_play_years.iloc[valid_idx],
+            'hold racket handed': y_racket_handed.iloc[valid_idx],
+            'level': y_level.iloc[valid_idx],
+        },
+        early_stopping_rounds=args.early_stopping,
+        checkpoint_dir=args.checkpoint_dir, checkpoint_every=args.checkpoint_every, resume=args.resume)
+    model_gender = boosters['gender']
+    model_play_years = boosters['play years']
+    model_racket_handed = boosters['hold racket handed']
+    model_level = boosters['level']
+
+    preprocessor.save(args.model_dir)
+    for name, booster in boosters.items():
+        booster.save_model(os.path.join(args.model_dir, f"{name}.txt"))
+
+    # 預測 Gender（二分類）
+    y_pred_gender = (model_gender.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
+    gender_accuracy = accuracy_score(y_test_gender, y_pred_gender)
+    gender_precision = precision_score(y_test_gender, y_pred_gender)
+    gender_recall = recall_score(y_test_gender, y_pred_gender)
+    gender_f1 = f1_score(y_test_gender, y_pred_gender)
+
+    # 預測 Play Years（多分類）
+    y_pred_play_years = model_play_years.predict(X_test).argmax(axis=1)  # 取機率最高的類別
+    play_years_accuracy = accuracy_score(y_test_play_years, y_pred_play_years)
+    play_years_precision = precision_score(y_test_play_years, y_pred_play_years, average='macro')
+    play_years_recall = recall_score(y_test_play_years, y_pred_play_years, average='macro')
+    play_years_f1 = f1_score(y_test_play_years, y_pred_play_years, average='macro')
+
+    # 預測 Racket Handed（二分類）
+    y_pred_racket_handed = (model_racket_handed.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
+    racket_handed_accuracy = accuracy_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_precision = precision_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_recall = recall_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_f1 = f1_score(y_test_racket_handed, y_pred_racket_handed)
+
+    # 預測 Level（多分類）
+    y_pred_level = model_level.predict(X_test).argmax(axis=1)  # 取機率最高的類別
+    level_accuracy = accuracy_score(y_test_level, y_pred_level)
+    level_precision = precision_score(y_test_level, y_pred_level, average='macro')
+    level_recall = recall_score(y_test_level, y_pred_level, average='macro')
+    level_f1 = f1_score(y_test_level, y_pred_level, average='macro')
+
+    # 總結各模型的準確率
+    print(f"Gender Precision: {gender_precision:.4f}, Recall: {gender_recall:.4f}, F1-Score: {gender_f1:.4f}")
+    print(f"Play Years Precision: {play_years_precision:.4f}, Recall: {play_years_recall:.4f}, F1-Score: {play_years_f1:.4f}")
+    print(f"Racket Handed Precision: {racket_handed_precision:.4f}, Recall: {racket_handed_recall:.4f}, F1-Score: {racket_handed_f1:.4f}")
+    print(f"Level Precision: {level_precision:.4f}, Recall: {level_recall:.4f}, F1-Score: {level_f1:.4f}")
+
+    """
+    model_gender_xgb = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss')
+    model_gender_xgb.fit(X_train, y_train_gender)
+
+    model_racket_handed_xgb = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss')
+    model_racket_handed_xgb.fit(X_train, y_train_racket_handed)
+
+    model_play_years_xgb = xgb.XGBClassifier(objective='multi:softmax', num_class=3)
+    model_play_years_xgb.fit(X_train, y_train_play_years)
+
+    model_level_xgb = xgb.XGBClassifier(objective='multi:softmax', num_class=3)
+    model_level_xgb.fit(X_train, y_train_level)
+
+    # 預測 Gender（二分類）
+    y_pred_gender = (model_gender_xgb.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
+    gender_accuracy = accuracy_score(y_test_gender, y_pred_gender)
+    gender_precision = precision_score(y_test_gender, y_pred_gender)
+    gender_recall = recall_score(y_test_gender, y_pred_gender)
+    gender_f1 = f1_score(y_test_gender, y_pred_gender)
+
+    # 預測 Play Years（多分類）
+    y_pred_play_years = model_play_years_xgb.predict(X_test) 
+    play_years_accuracy = accuracy_score(y_test_play_years, y_pred_play_years)
+    play_years_precision = precision_score(y_test_play_years, y_pred_play_years, average='macro')
+    play_years_recall = recall_score(y_test_play_years, y_pred_play_years, average='macro')
+    play_years_f1 = f1_score(y_test_play_years, y_pred_play_years, average='macro')
+
+    # 預測 Racket Handed（二分類）
+    y_pred_racket_handed = (model_racket_handed_xgb.predict(X_test) > 0.5).astype(int)  # 二分類結果 > 0.5 視為 1
+    racket_handed_accuracy = accuracy_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_precision = precision_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_recall = recall_score(y_test_racket_handed, y_pred_racket_handed)
+    racket_handed_f1 = f1_score(y_test_racket_handed, y_pred_racket_handed)
+
+    # 預測 Level（多分類）
+    y_pred_level = model_level_xgb.predict(X_test) 
+    level_accuracy = accuracy_score(y_test_level, y_pred_level)
+    level_precision = precision_score(y_test_level, y_pred_level, average='macro')
+    level_recall = recall_score(y_test_level, y_pred_level, average='macro')
+    level_f1 = f1_score(y_test_level, y_pred_level, average='macro')
+
+    # 總結各模型的準確率
+    print(f"Gender Precision: {gender_precision:.4f}, Recall: {gender_recall:.4f}, F1-Score: {gender_f1:.4f}")
+    print(f"Play Years Precision: {play_years_precision:.4f}, Recall: {play_years_recall:.4f}, F1-Score: {play_years_f1:.4f}")
+    print(f"Racket Handed Precision: {racket_handed_precision:.4f}, Recall: {racket_handed_recall:.4f}, F1-Score: {racket_handed_f1:.4f}")
+    print(f"Level Precision: {level_precision:.4f}, Recall: {level_recall:.4f}, F1-Score: {level_f1:.4f}")
+    """
+
+    test_data = pd.read_csv('test.csv')
+    X = preprocessor.transform(test_data)  # 使用訓練時的 scaler，不再對測試資料重新 fit
+
+    # 預測 Gender（二分類）
+    y_pred_gender = model_gender.predict(X)
+
+    # 預測 Play Years（多分類）
+    y_pred_play_years = model_play_years.predict(X)
+
+    # 預測 Racket Handed（二分類）
+    y_pred_racket_handed = model_racket_handed.predict(X)
+
+    # 預測 Level（多分類）
+    y_pred_level = model_level.predict(X)
+
+    predicted = pd.DataFrame({
+        'data_ID': test_data['data_ID'],
+        'gender': y_pred_gender,
+        'hold racket handed': y_pred_racket_handed,
+        'play years_0': y_pred_play_years[:,0],
+        'play years_1': y_pred_play_years[:,1],
+        'play years_2': y_pred_play_years[:,2],
+        'level_0': y_pred_level[:,0],
+        'level_1': y_pred_level[:,1],
+        'level_2': y_pred_level[:,2],
+    })
+
+    predicted.to_csv('submission_lgb.csv', index=False)
+    """
+    # 預測 Gender（二分類）
+    y_pred_gender = model_gender_xgb.predict_proba(X)[:, 1]
+
+    # 預測 Play Years（多分類）
+    y_pred_play_years = model_play_years_xgb.predict_proba(X)
+
+    # 預測 Racket Handed（二分類）
+    y_pred_racket_handed = model_racket_handed_xgb.predict_proba(X)[:, 1]
+
+    # 預測 Level（多分類）
+    y_pred_level = model_level_xgb.predict_proba(X)
+
+    predicted = pd.DataFrame({
+        'data_ID': test_data['data_ID'],
+        'gender': y_pred_gender,
+        'hold racket handed': y_pred_racket_handed,
+        'play years_0': y_pred_play_years[:,0],
+        'play years_1': y_pred_play_years[:,1],
+        'play years_2': y_pred_play_years[:,2],
+        'level_0': y_pred_level[:,0],
+        'level_1': y_pred_level[:,1],
+        'level_2': y_pred_level[:,2],
+    })
+
+    predicted.to_csv('submission_xgb.csv', index=False)
+    """
@@ -0,0 +1,137 @@
+import os
+import time
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import lightgbm as lgb
+
+# 多目標 LightGBM 訓練
+# 特徵矩陣只 bin 一次並存成 LightGBM 的二進位 Dataset，各目標只換 label，
+# 不再為每個目標重新建構 lgb.Dataset；四個目標可用 process pool 同時訓練，
+# 並平均分配執行緒數。n_jobs=1 時依序訓練，結果與原本逐一 lgb.train 相同。
+# 另外支援以驗證集 early stopping、定期存檔，以及從存檔（init_model）接續訓練。
+
+
+# 建構一次 bin 好的 Dataset 並存檔（worker 直接載入，不必重新分箱）
+def build_binned_dataset(X_train, params, path):
+    dataset = lgb.Dataset(X_train, params=dataset_params(params), free_raw_data=True)
+    dataset.construct()
+    if os.path.exists(path):
+        os.remove(path)
+    dataset.save_binary(path)
+    return path
+
+
+# 只保留會影響 Dataset 建構的參數（例如 seed 相關的參數）
+def dataset_params(params):
+    keys = ('random_state', 'seed', 'data_random_seed', 'max_bin', 'min_data_in_bin', 'verbose')
+    return {key: value for key, value in params.items() if key in keys}
+
+
+# 每 every 輪把目前的模型寫到 path（先寫暫存檔再取代，中斷時不會留下不完整的檔案）
+def checkpoint_callback(path, every):
+    def _callback(env):
+        if (env.iteration + 1) % every == 0:
+            env.model.save_model(path + ".tmp", num_iteration=-1)
+            os.replace(path + ".tmp", path)
+    _callback.order = 30
+    return _callback
+
+
+# data: bin 好的 Dataset 路徑，或原始特徵（從 init_model 接續訓練時需要原始特徵來計算起始分數）
+# valid: (X_valid, y_valid)，提供時以驗證集做 early stopping
+def train_target(data, label, params, num_boost_round, num_threads=None, valid=None,
+                 early_stopping_rounds=None, checkpoint_path=None, checkpoint_every=50, init_model=None):
+    params = dict(params)
+    if num_threads:
+        params['num_threads'] = num_threads
+    dataset = lgb.Dataset(data, label=label, params=dataset_params(params))
+
+    valid_sets, callbacks = [], []
+    if valid is not None:
+        valid_sets.append(lgb.Dataset(valid[0], label=valid[1], reference=dataset))
+        if early_stopping_rounds:
+            callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+    if checkpoint_path:
+        callbacks.append(checkpoint_callback(checkpoint_path, checkpoint_every))
+
+    # 記錄實際跑了幾輪（early stopping 後回傳的模型只保留到最佳輪數）
+    init_rounds = lgb.Booster(model_file=init_model).current_iteration() if init_model else 0
+    last_iteration = [init_rounds - 1]
+    callbacks.append(lambda env: last_iteration.__setitem__(0, env.iteration))
+
+    start = time.perf_counter()
+    booster = lgb.train(params, dataset, num_boost_round=num_boost_round, valid_sets=valid_sets,
+                        callbacks=callbacks, init_model=init_model)
+    seconds = time.perf_counter() - start
+    rounds_trained = last_iteration[0] + 1 - init_rounds
+    if checkpoint_path:
+        booster.save_model(checkpoint_path + ".tmp")  # 有 early stopping 時只保留最佳輪數
+        os.replace(checkpoint_path + ".tmp", checkpoint_path)
+    return {
+        'model': booster.model_to_string(),
+        'seconds': seconds,
+        'rounds_trained': rounds_trained,
+        'best_iteration': booster.best_iteration or booster.current_iteration(),
+        'init_rounds': init_rounds,
+    }
+
+
+# targets: {名稱: (y_train, params)}；回傳 {名稱: Booster}
+# valid_targets: {名稱: y_valid}，搭配 X_valid 與 early_stopping_rounds 使用
+# checkpoint_dir: 每 checkpoint_every 輪把模型存成 <checkpoint_dir>/<名稱>.txt；
+# resume=True 時從該檔案（init_model）接續訓練，而不是從頭開始
+def train_targets(X_train, targets, num_boost_round=800, n_jobs=1, total_threads=None, binned_path=None,
+                  X_valid=None, valid_targets=None, early_stopping_rounds=None,
+                  checkpoint_dir=None, checkpoint_every=50, resume=False):
+    total_threads = total_threads or os.cpu_count() or 1
+    first_params = next(iter(targets.values()))[1]
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binned_path = binned_path or os.path.join(tmp_dir, "train.bin")
+        start = time.perf_counter()
+        build_binned_dataset(X_train, first_params, binned_path)
+        print(f"Binned dataset built once in {time.perf_counter() - start:.2f}s")
+
+        jobs = {}
+        for name, (y, params) in targets.items():
+            checkpoint_path = os.path.join(checkpoint_dir, f"{name}.txt") if checkpoint_dir else None
+            init_model = checkpoint_path if resume and checkpoint_path and os.path.exists(checkpoint_path) else None
+            valid = (X_valid, np.asarray(valid_targets[name])) if X_valid is not None and valid_targets else None
+            jobs[name] = dict(
+                data=X_train if init_model else binned_path, label=np.asarray(y), params=params,
+                num_boost_round=num_boost_round, valid=valid, early_stopping_rounds=early_stopping_rounds,
+                checkpoint_path=checkpoint_path, checkpoint_every=checkpoint_every, init_model=init_model,
+            )
+
+        if n_jobs == 1:
+            results = {name: train_target(**job) for name, job in jobs.items()}
+        else:
+            threads_per_job = max(1, total_threads // min(n_jobs, len(jobs)))
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                futures = {
+                    name: pool.submit(train_target, num_threads=threads_per_job, **job)
+                    for name, job in jobs.items()
+                }
+                results = {name: future.result() for name, future in futures.items()}
+
+    boosters = {}
+    for name, result in results.items():
+        log_training(name, result, num_boost_round)
+        boosters[name] = lgb.Booster(model_str=result['model'])
+    return boosters
+
+
+# 輸出每個目標實際訓練的輪數，以及 early stopping 省下的時間（以平均每輪時間估算）
+def log_training(name, result, num_boost_round):
+    rounds = result['rounds_trained']
+    line = f"Trained {name}: {rounds}/{num_boost_round} rounds in {result['seconds']:.2f}s"
+    if result['init_rounds']:
+        line += f" (continued from {result['init_rounds']} checkpointed rounds)"
+    line += f", best iteration {result['best_iteration']}"
+    if rounds and rounds < num_boost_round:
+        saved = (num_boost_round - rounds) * result['seconds'] / rounds
+        line += f", ~{saved:.2f}s saved by early stopping"
+    print(line)
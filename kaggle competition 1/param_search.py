@@ -0,0 +1,314 @@
+import os
+import math
+import json
+import time
+import random
+import sqlite3
+import argparse
+import itertools
+import tempfile
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from lgb_training import build_binned_dataset
+from preprocessing import Preprocessor, split_indices, target_columns
+
+# params_binary / params_multiclass 的超參數搜尋
+# - 策略：grid（全部組合）、random（隨機抽 n 組）、halving（successive halving：
+#   先用少量輪數跑所有組合，每一輪只留下最好的 1/eta，再把輪數乘上 eta）
+# - 訓練特徵只 bin 一次存成二進位 Dataset，所有 trial 與目標共用，各 trial 在 process pool 中執行
+# - 每個 trial 在 abort_after 輪時，若驗證 loss 比已完成 trial 在同一輪的最佳 loss
+#   差超過 abort_margin，就提前中止
+# - 所有 trial 與每次搜尋的最佳參數都記錄在本機 SQLite（param_search.db）
+#   python param_search.py --strategy random --trials 40 --n-jobs 4
+#   python param_search.py --show
+
+db_path = "param_search.db"
+
+# 依照 first_kaggle.py 中手動調整過的範圍
+default_space = {
+    'learning_rate': [0.03, 0.06, 0.1],
+    'max_depth': [2, 3, 4],
+    'num_leaves': [4, 8, 15],
+    'reg_alpha': [0.5, 2.0, 5.0],
+    'reg_lambda': [0.5, 2.0, 5.0],
+    'feature_fraction': [0.6, 0.8, 1.0],
+    'bagging_fraction': [0.6, 0.8, 1.0],
+}
+
+
+class SearchStore:
+    def __init__(self, path=db_path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS searches (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    target TEXT NOT NULL,
+                    strategy TEXT NOT NULL,
+                    space TEXT NOT NULL,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    best_params TEXT,
+                    best_score REAL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS trials (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    search_id INTEGER NOT NULL REFERENCES searches (id),
+                    params TEXT NOT NULL,
+                    num_boost_round INTEGER NOT NULL,
+                    rounds_trained INTEGER NOT NULL,
+                    best_iteration INTEGER NOT NULL,
+                    score REAL NOT NULL,
+                    status TEXT NOT NULL,
+                    seconds REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start_search(self, target, strategy, space):
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO searches (target, strategy, space, started_at) VALUES (?, ?, ?, ?)",
+                (target, strategy, json.dumps(space), time.time())
+            )
+            return cursor.lastrowid
+
+    def record_trial(self, search_id, params, num_boost_round, result):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO trials (search_id, params, num_boost_round, rounds_trained, best_iteration, score, status, seconds)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (search_id, json.dumps(params), num_boost_round, result['rounds_trained'],
+                 result['best_iteration'], result['score'], result['status'], result['seconds'])
+            )
+
+    def finish_search(self, search_id, best_params, best_score):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE searches SET finished_at = ?, best_params = ?, best_score = ? WHERE id = ?",
+                (time.time(), json.dumps(best_params), best_score, search_id)
+            )
+
+    # 每個目標最近一次完成的搜尋所找到的最佳參數：{目標: (參數, 分數)}
+    def best_params(self):
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT target, best_params, best_score FROM searches
+                WHERE id IN (SELECT MAX(id) FROM searches WHERE finished_at IS NOT NULL GROUP BY target)
+            """).fetchall()
+        return {target: (json.loads(params), score) for target, params, score in rows}
+
+
+# ==============================
+# Trials
+# ==============================
+# 在 abort_after 輪記錄驗證 loss；比其他 trial 同一輪的最佳 loss 差太多就以 EarlyStopException 結束訓練
+def abort_callback(shared_best, target, abort_after, abort_margin, checkpoint):
+    def _callback(env):
+        if env.iteration + 1 != abort_after:
+            return
+        best = shared_best.get(target)
+        score = env.evaluation_result_list[0][2]
+        checkpoint['score'] = score
+        if best is not None and score > best * (1 + abort_margin):
+            checkpoint['aborted'] = True
+            raise lgb.callback.EarlyStopException(env.iteration, env.evaluation_result_list)
+    _callback.order = 40
+    return _callback
+
+
+def run_trial(binned_path, y_train, X_valid, y_valid, params, num_boost_round, target=None, shared_best=None,
+              abort_after=200, abort_margin=0.05, early_stopping_rounds=50, num_threads=None):
+    params = dict(params, verbose=-1)
+    if num_threads:
+        params['num_threads'] = num_threads
+    train_set = lgb.Dataset(binned_path, label=y_train, params={'verbose': -1})
+    valid_set = lgb.Dataset(X_valid, label=y_valid, reference=train_set)
+
+    last_iteration, checkpoint = [-1], {}
+    callbacks = [lambda env: last_iteration.__setitem__(0, env.iteration)]
+    if early_stopping_rounds:
+        callbacks.append(lgb.early_stopping(early_stopping_rounds, verbose=False))
+    if shared_best is not None and abort_after and abort_after < num_boost_round:
+        callbacks.append(abort_callback(shared_best, target, abort_after, abort_margin, checkpoint))
+
+    start = time.perf_counter()
+    booster = lgb.train(params, train_set, num_boost_round=num_boost_round, valid_sets=[valid_set], callbacks=callbacks)
+    score = next(iter(booster.best_score['valid_0'].values()))
+    return {
+        'score': float(score),
+        'best_iteration': booster.best_iteration or booster.current_iteration(),
+        'rounds_trained': last_iteration[0] + 1,
+        'status': 'aborted' if checkpoint.get('aborted') else 'finished',
+        'checkpoint_score': checkpoint.get('score'),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+# ==============================
+# Strategies
+# ==============================
+def grid_configs(space):
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+
+
+def random_configs(space, n_trials, seed=0):
+    grid = grid_configs(space)
+    return random.Random(seed).sample(grid, min(n_trials, len(grid)))
+
+
+class ParamSearch:
+    def __init__(self, binned_path, X_valid, store, n_jobs=1, total_threads=None,
+                 abort_after=200, abort_margin=0.05, early_stopping_rounds=50):
+        self.binned_path = binned_path
+        self.X_valid = X_valid
+        self.store = store
+        self.n_jobs = n_jobs
+        self.threads_per_trial = max(1, (total_threads or os.cpu_count() or 1) // n_jobs)
+        self.abort_after = abort_after
+        self.abort_margin = abort_margin
+        self.early_stopping_rounds = early_stopping_rounds
+
+    # 平行執行一組 trial；完成的 trial 會更新共享的 abort_after 輪最佳 loss，供其他 trial 判斷是否中止
+    def run_trials(self, search_id, target, base_params, configs, y_train, y_valid, num_boost_round, pool, shared_best):
+        common = dict(target=target, shared_best=shared_best, abort_after=self.abort_after,
+                      abort_margin=self.abort_margin, early_stopping_rounds=self.early_stopping_rounds,
+                      num_threads=self.threads_per_trial)
+        results = [None] * len(configs)
+
+        def finish(i, result):
+            results[i] = result
+            self.store.record_trial(search_id, configs[i], num_boost_round, result)
+            checkpoint_score = result['checkpoint_score']
+            if checkpoint_score is not None and checkpoint_score < shared_best.get(target, math.inf):
+                shared_best[target] = checkpoint_score
+            print(f"  [{target}] {result['status']:<8} score={result['score']:.5f} "
+                  f"rounds={result['rounds_trained']:>4} {result['seconds']:.2f}s {configs[i]}")
+
+        if pool is None:
+            for i, config in enumerate(configs):
+                finish(i, run_trial(self.binned_path, y_train, self.X_valid, y_valid,
+                                    dict(base_params, **config), num_boost_round, **common))
+        else:
+            futures = {
+                pool.submit(run_trial, self.binned_path, y_train, self.X_valid, y_valid,
+                            dict(base_params, **config), num_boost_round, **common): i
+                for i, config in enumerate(configs)
+            }
+            for future in as_completed(futures):
+                finish(futures[future], future.result())
+        return results
+
+    # strategy: 'grid' / 'random' / 'halving'；回傳 (最佳參數, 最佳分數)
+    def search(self, target, base_params, y_train, y_valid, space=default_space, strategy='random',
+               n_trials=30, num_boost_round=800, min_rounds=100, eta=3, seed=0):
+        search_id = self.store.start_search(target, strategy, space)
+        configs = grid_configs(space) if strategy == 'grid' else random_configs(space, n_trials, seed)
+        y_train, y_valid = np.asarray(y_train), np.asarray(y_valid)
+
+        manager = multiprocessing.Manager() if self.n_jobs > 1 else None
+        shared_best = manager.dict() if manager else {}
+        pool = ProcessPoolExecutor(max_workers=self.n_jobs) if self.n_jobs > 1 else None
+        try:
+            if strategy == 'halving':
+                rounds = min(min_rounds, num_boost_round)
+                while True:
+                    print(f"[{target}] {len(configs)} configs x {rounds} rounds")
+                    results = self.run_trials(search_id, target, base_params, configs, y_train, y_valid,
+                                              rounds, pool, shared_best)
+                    ranked = sorted(zip(results, configs), key=lambda pair: pair[0]['score'])
+                    if len(configs) == 1 or rounds >= num_boost_round:
+                        break
+                    configs = [config for _, config in ranked[:max(1, math.ceil(len(configs) / eta))]]
+                    rounds = min(rounds * eta, num_boost_round)
+            else:
+                print(f"[{target}] {len(configs)} configs x {num_boost_round} rounds")
+                results = self.run_trials(search_id, target, base_params, configs, y_train, y_valid,
+                                          num_boost_round, pool, shared_best)
+                ranked = sorted(zip(results, configs), key=lambda pair: pair[0]['score'])
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if manager is not None:
+                manager.shutdown()
+
+        finished = [pair for pair in ranked if pair[0]['status'] == 'finished'] or ranked
+        best_result, best_config = finished[0]
+        best_params = dict(base_params, **best_config)
+        self.store.finish_search(search_id, best_params, best_result['score'])
+        print(f"[{target}] best score {best_result['score']:.5f}: {best_params}")
+        return best_params, best_result['score']
+
+
+def show_best(store):
+    for target, (params, score) in sorted(store.best_params().items()):
+        print(f"{target}: score={score:.5f}")
+        print(f"  {params}")
+
+
+if __name__ == '__main__':
+    from first_kaggle import params_binary, params_multiclass
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='random')
+    parser.add_argument('--trials', type=int, default=30, help="random / halving 的組合數")
+    parser.add_argument('--targets', nargs='+', default=target_columns, choices=target_columns)
+    parser.add_argument('--rounds', type=int, default=800, help="每個 trial 最多的 boosting 輪數")
+    parser.add_argument('--min-rounds', type=int, default=100, help="successive halving 第一輪的輪數")
+    parser.add_argument('--eta', type=int, default=3, help="successive halving 每輪保留 1/eta")
+    parser.add_argument('--abort-after', type=int, default=200, help="在這一輪檢查是否提前中止")
+    parser.add_argument('--abort-margin', type=float, default=0.05, help="比目前最佳 loss 差超過這個比例就中止")
+    parser.add_argument('--early-stopping', type=int, default=50)
+    parser.add_argument('--n-jobs', type=int, default=1, help="同時執行的 trial 數")
+    parser.add_argument('--threads', type=int, default=None, help="所有 trial 共用的執行緒總數")
+    parser.add_argument('--space', default=None, help="JSON 檔，格式為 {參數: [候選值, ...]}")
+    parser.add_argument('--db', default=db_path)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--show', action='store_true', help="只列出每個目標目前的最佳參數")
+    args = parser.parse_args()
+
+    store = SearchStore(args.db)
+    if args.show:
+        show_best(store)
+        raise SystemExit
+
+    space = default_space
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+
+    train_data = pd.read_csv('train.csv')
+    X = Preprocessor().fit_transform(train_data)
+    train_idx, valid_idx = split_indices(len(X), test_size=0.2, random_state=0)
+    base_params = {
+        'gender': params_binary, 'hold racket handed': params_binary,
+        'play years': params_multiclass, 'level': params_multiclass,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        binned_path = build_binned_dataset(X[train_idx], params_binary, os.path.join(tmp_dir, "train.bin"))
+        searcher = ParamSearch(binned_path, X[valid_idx], store, args.n_jobs, args.threads,
+                               args.abort_after, args.abort_margin, args.early_stopping)
+        for target in args.targets:
+            y = train_data[target].to_numpy()
+            searcher.search(target, base_params[target], y[train_idx], y[valid_idx], space, args.strategy,
+                            args.trials, args.rounds, args.min_rounds, args.eta, args.seed)
+
+    print()
+    show_best(store)
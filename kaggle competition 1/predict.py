@@ -0,0 +1,73 @@
+import os
+import time
+import argparse
+import pandas as pd
+import lightgbm as lgb
+from preprocessing import Preprocessor, id_column
+
+# 批次預測
+# 載入 first_kaggle.py 存下的 scaler 與四個模型，分批讀取輸入 CSV，
+# 每批標準化後一次 predict，再附加寫到輸出檔（欄位與 submission_lgb.csv 相同），
+# 記憶體用量只跟 chunksize 有關，與輸入檔大小無關。
+#   python predict.py --input test.csv --output submission_lgb.csv --chunksize 100000
+# --backend compiled 使用 compiled_backend.py 編譯好的模型（需先編譯）。
+
+target_names = ['gender', 'play years', 'hold racket handed', 'level']
+
+
+def load_models(model_dir, backend='native'):
+    preprocessor = Preprocessor.load(model_dir)
+    if backend == 'compiled':
+        from compiled_backend import load_compiled_models
+        return preprocessor, load_compiled_models(model_dir, target_names)
+    boosters = {name: lgb.Booster(model_file=os.path.join(model_dir, f"{name}.txt")) for name in target_names}
+    return preprocessor, boosters
+
+
+# 與 first_kaggle.py 輸出的 submission 欄位順序相同
+def submission_frame(data_ids, predictions):
+    play_years, level = predictions['play years'], predictions['level']
+    return pd.DataFrame({
+        id_column: data_ids,
+        'gender': predictions['gender'],
+        'hold racket handed': predictions['hold racket handed'],
+        'play years_0': play_years[:, 0],
+        'play years_1': play_years[:, 1],
+        'play years_2': play_years[:, 2],
+        'level_0': level[:, 0],
+        'level_1': level[:, 1],
+        'level_2': level[:, 2],
+    })
+
+
+def predict_chunk(preprocessor, boosters, chunk):
+    X = preprocessor.transform(chunk)
+    predictions = {name: booster.predict(X) for name, booster in boosters.items()}
+    return submission_frame(chunk[id_column].to_numpy(), predictions)
+
+
+def predict_csv(input_path, output_path, model_dir='models', chunksize=100_000, backend='native'):
+    preprocessor, boosters = load_models(model_dir, backend)
+    total_rows, start = 0, time.perf_counter()
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunksize)):
+        chunk_start = time.perf_counter()
+        predicted = predict_chunk(preprocessor, boosters, chunk)
+        predicted.to_csv(output_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        total_rows += len(chunk)
+        print(f"chunk {i}: {len(chunk)} rows, {len(chunk) / (time.perf_counter() - chunk_start):.0f} rows/sec")
+
+    elapsed = time.perf_counter() - start
+    print(f"Predicted {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed:.0f} rows/sec) -> {output_path}")
+    return total_rows
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='test.csv')
+    parser.add_argument('--output', default='submission_lgb.csv')
+    parser.add_argument('--model-dir', default='models', help="first_kaggle.py 的 --model-dir")
+    parser.add_argument('--chunksize', type=int, default=100_000, help="每批讀取的列數")
+    parser.add_argument('--backend', choices=['native', 'compiled'], default='native', help="compiled：使用 compiled_backend.py 編譯的模型")
+    args = parser.parse_args()
+
+    predict_csv(args.input, args.output, args.model_dir, args.chunksize, args.backend)
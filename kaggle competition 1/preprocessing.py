@@ -0,0 +1,63 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+# 訓練與推論共用的前處理
+# 在 train.csv 上 fit 一次 StandardScaler，存到模型資料夾；推論時直接套用同一組
+# mean / scale，不再對 test.csv 重新 fit，所以可以一筆一筆或分批串流預測，
+# 結果也不會因為同一批裡有哪些資料而改變。
+
+id_column = 'data_ID'
+target_columns = ['gender', 'play years', 'hold racket handed', 'level']
+drop_columns = [id_column, 'player_ID'] + target_columns
+
+
+class Preprocessor:
+    def __init__(self, feature_columns=None, mean=None, scale=None):
+        self.feature_columns = feature_columns
+        self.mean = None if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+
+    def fit(self, train_data):
+        features = train_data.drop(columns=[col for col in drop_columns if col in train_data.columns])
+        self.feature_columns = list(features.columns)
+        scaler = StandardScaler().fit(features)
+        self.mean, self.scale = scaler.mean_, scaler.scale_
+        return self
+
+    # data: DataFrame、單筆 dict 或一批 dict；依 fit 時的欄位順序取特徵後標準化
+    # （與 StandardScaler.transform 的計算相同）
+    def transform(self, data):
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, pd.DataFrame):
+            data = pd.DataFrame(data)
+        X = data[self.feature_columns].to_numpy(dtype=np.float64)
+        return (X - self.mean) / self.scale
+
+    def fit_transform(self, train_data):
+        return self.fit(train_data).transform(train_data)
+
+    def save(self, model_dir):
+        os.makedirs(model_dir, exist_ok=True)
+        with open(os.path.join(model_dir, "preprocessor.json"), "w") as f:
+            json.dump({
+                "feature_columns": self.feature_columns,
+                "mean": self.mean.tolist(),
+                "scale": self.scale.tolist(),
+            }, f)
+
+    @classmethod
+    def load(cls, model_dir):
+        with open(os.path.join(model_dir, "preprocessor.json")) as f:
+            state = json.load(f)
+        return cls(state["feature_columns"], state["mean"], state["scale"])
+
+
+# 只切一次 index，所有目標共用同一組 train / test 列
+# （與對每個目標各呼叫一次 train_test_split(X, y, ...) 的切法相同）
+def split_indices(n_rows, test_size=0.2, random_state=0):
+    return train_test_split(np.arange(n_rows), test_size=test_size, random_state=random_state)
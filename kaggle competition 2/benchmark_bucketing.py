@@ -0,0 +1,86 @@
+import argparse
+import time
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras.optimizers import Adam
+from sequence_data import feature_cols, fixed_length, count_sequence_lengths
+from input_pipeline import RaggedSource, make_dataset
+from bucketing import bucket_boundaries, min_input_length, padding_stats, make_bucketed_dataset
+from second_kaggle import SEED, conv_blocks, create_cnn_model, task_loss
+
+# Benchmark: fixed-length padding vs length-bucketed batches (second_kaggle.py --bucketed).
+# Padded timesteps and the largest batch tensor are computed for every bucket count from the
+# sequence lengths of --input (or synthetic lengths); one training epoch of the Gender CNN is then
+# timed on --train-sequences random sequences with each batching.
+#   python benchmark_bucketing.py --input train_data.csv --buckets 2 4 8
+#   python benchmark_bucketing.py --sequences 20000 --mean-length 600
+
+
+def synthetic_lengths(n_sequences, mean_length, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.integers(max(1, mean_length // 2), mean_length * 3 // 2 + 1, n_sequences)
+
+
+# Random rows with the given sequence lengths; labels are random, only the timing matters
+def synthetic_source(lengths, seed=0):
+    rng = np.random.default_rng(seed)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    values = rng.normal(size=(offsets[-1], len(feature_cols))).astype(np.float32)
+    return RaggedSource(values, offsets, fixed_length), rng.integers(0, 2, (len(lengths), 1)).astype(np.float32)
+
+
+# Best of several epochs, after a warm-up epoch that traces the training step
+def epoch_time(input_shape, dataset, mask_aware, epochs=3):
+    model = create_cnn_model(input_shape, 1, "Gender_Model", mask_aware=mask_aware)
+    model.compile(optimizer=Adam(learning_rate=0.001), loss=task_loss(1))
+    model.fit(dataset, epochs=1, verbose=0)
+    times = []
+    for _ in range(epochs):
+        start = time.perf_counter()
+        model.fit(dataset, epochs=1, verbose=0)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', help="take sequence lengths from this CSV (e.g. train_data.csv) instead of synthetic ones")
+    parser.add_argument('--sequences', type=int, default=20000, help="synthetic sequence count")
+    parser.add_argument('--mean-length', type=int, default=600, help="synthetic lengths are uniform in [mean/2, 3*mean/2]")
+    parser.add_argument('--buckets', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--train-sequences', type=int, default=512, help="sequences per timed epoch (0 skips the timing)")
+    args = parser.parse_args()
+
+    lengths = (count_sequence_lengths(args.input).to_numpy() if args.input
+               else synthetic_lengths(args.sequences, args.mean_length))
+    min_length = min_input_length([kernel_size for _, kernel_size in conv_blocks])
+    print(f"{len(lengths)} sequences, length min/median/max {lengths.min()}/{int(np.median(lengths))}/{lengths.max()}, "
+          f"fixed_length={fixed_length}, shortest bucket {min_length}")
+
+    print(f"\n{'buckets':>8} {'boundaries':<36} {'timesteps':>12} {'vs fixed':>9} {'real rows':>10} {'batch MB':>9}")
+    real = np.minimum(lengths, fixed_length).sum()
+    fixed_steps = len(lengths) * fixed_length
+    print(f"{'fixed':>8} {'':<36} {fixed_steps:>12} {1:>9.1%} {real / fixed_steps:>10.1%} "
+          f"{min(len(lengths), args.batch_size) * fixed_length * len(feature_cols) * 4 / 1e6:>9.2f}")
+    all_boundaries = {}
+    for n_buckets in args.buckets:
+        boundaries = all_boundaries[n_buckets] = bucket_boundaries(lengths, n_buckets, min_length, fixed_length)
+        stats = padding_stats(lengths, boundaries, args.batch_size, fixed_length)
+        print(f"{n_buckets:>8} {str(boundaries.tolist()):<36} {stats['bucketed_timesteps']:>12} "
+              f"{stats['bucketed_timesteps'] / stats['fixed_timesteps']:>9.1%} "
+              f"{stats['real_timesteps'] / stats['bucketed_timesteps']:>10.1%} {stats['bucketed_batch_mb']:>9.2f}")
+
+    if args.train_sequences:
+        tf.keras.utils.set_random_seed(SEED)
+        sample = np.random.default_rng(SEED).choice(lengths, min(args.train_sequences, len(lengths)), replace=False)
+        source, Y = synthetic_source(sample)
+        indices = np.arange(len(sample))
+        print(f"\nOne training epoch on {len(sample)} sequences (batch size {args.batch_size}):")
+        fixed_time = epoch_time((fixed_length, len(feature_cols)),
+                                make_dataset(source, Y, indices, args.batch_size, shuffle=True, seed=SEED), False)
+        print(f"{'fixed':>8} {fixed_time:>8.2f}s")
+        for n_buckets, boundaries in all_boundaries.items():
+            dataset = make_bucketed_dataset(source, Y, indices, boundaries, args.batch_size, shuffle=True, seed=SEED)
+            bucketed_time = epoch_time((None, len(feature_cols)), dataset, True)
+            print(f"{n_buckets:>8} {bucketed_time:>8.2f}s  ({fixed_time / bucketed_time:.2f}x)")
@@ -0,0 +1,49 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from sequence_data import feature_cols, group_data, preprocess_sequences, preprocess_frame
+
+# Benchmark: loop-based group_data + preprocess_sequences vs preprocess_frame (vectorized)
+# on synthetic swing data. Large sequence counts use a shorter fixed_length so the
+# output tensor fits in memory; the loop version is skipped above --loop-limit.
+#   python benchmark_preprocess.py --sequences 10000 100000 1000000 --fixed-length 30
+
+
+def synthetic_rows(n_sequences, mean_length, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(max(1, mean_length // 2), mean_length * 3 // 2 + 1, n_sequences)
+    data_ids = np.repeat(np.arange(1, n_sequences + 1), lengths)
+    frame = pd.DataFrame(rng.normal(size=(len(data_ids), len(feature_cols))).astype(np.float32), columns=feature_cols)
+    frame.insert(0, 'data_id', data_ids)
+    return frame
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sequences', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--fixed-length', type=int, default=30)
+    parser.add_argument('--mean-length', type=int, default=30)
+    parser.add_argument('--loop-limit', type=int, default=100000, help="skip the loop version above this many sequences")
+    args = parser.parse_args()
+
+    print(f"{'sequences':>10} {'rows':>11} {'loop (s)':>9} {'vectorized (s)':>15} {'speedup':>8} {'equal':>6}")
+    for n_sequences in args.sequences:
+        frame = synthetic_rows(n_sequences, args.mean_length)
+        (X_fast, _), fast_time = timed(preprocess_frame, frame, args.fixed_length)
+
+        if n_sequences <= args.loop_limit:
+            X_loop, loop_time = timed(lambda: preprocess_sequences(group_data(frame), args.fixed_length))
+            equal = str(np.array_equal(X_loop, X_fast))
+            loop_col, speedup = f"{loop_time:>9.2f}", f"{loop_time / fast_time:>7.1f}x"
+            del X_loop
+        else:
+            equal, loop_col, speedup = "-", f"{'-':>9}", f"{'-':>8}"
+        print(f"{n_sequences:>10} {len(frame):>11} {loop_col} {fast_time:>15.2f} {speedup} {equal:>6}")
+        del X_fast, frame
@@ -0,0 +1,142 @@
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from sequence_data import pad_value
+
+# ==============================
+# Length-Bucketed Batching
+# ==============================
+# Instead of padding every swing to fixed_length, sequences are grouped by length into a few
+# buckets and each batch is padded (at the end) only up to its bucket's boundary. Sequences longer
+# than the last boundary are center-cropped to it; with the default boundaries nothing is cropped.
+# MaskedGlobalAveragePooling1D averages only the timesteps computed from real rows, so a sequence
+# gets the same prediction whatever bucket length it is padded to.
+
+
+# Output length of the Conv1D ('valid') + MaxPooling1D stages for inputs of the given lengths
+def output_length(lengths, kernel_sizes, pool_size=3):
+    lengths = np.asarray(lengths)
+    for kernel_size in kernel_sizes:
+        lengths = (lengths - kernel_size + 1) // pool_size
+    return lengths
+
+
+# Shortest input that still leaves one output timestep after the conv stack
+def min_input_length(kernel_sizes, pool_size=3):
+    length = 1
+    for kernel_size in reversed(kernel_sizes):
+        length = length * pool_size + kernel_size - 1
+    return length
+
+
+# Boundaries at length quantiles, so buckets hold roughly equal numbers of sequences.
+# The last boundary is the longest sequence, capped at max_length (longer sequences are cropped);
+# no boundary is shorter than min_length.
+def bucket_boundaries(lengths, n_buckets=4, min_length=1, max_length=None):
+    lengths = np.asarray(lengths)
+    max_length = int(lengths.max()) if max_length is None else min(int(lengths.max()), max_length)
+    max_length = max(max_length, min_length)
+    quantiles = np.ceil(np.quantile(lengths, np.linspace(0, 1, n_buckets + 1)[1:-1])).astype(np.int64)
+    boundaries = np.clip(np.append(quantiles, max_length), min_length, max_length)
+    return np.unique(boundaries)
+
+
+def assign_buckets(lengths, boundaries):
+    return np.minimum(np.searchsorted(boundaries, lengths), len(boundaries) - 1)
+
+
+# Order in which make_bucketed_dataset(shuffle=False) yields the given sequences
+def bucket_order(lengths, boundaries):
+    return np.argsort(assign_buckets(lengths, boundaries), kind='stable')
+
+
+# Padded timesteps per epoch and the largest batch tensor, fixed-length vs bucketed
+def padding_stats(lengths, boundaries, batch_size, fixed_length, n_features=6):
+    buckets = assign_buckets(lengths, boundaries)
+    sizes = np.bincount(buckets, minlength=len(boundaries))
+    bucketed_steps = int((sizes * boundaries).sum())
+    largest_batch = int(max(min(size, batch_size) * boundary for size, boundary in zip(sizes, boundaries) if size))
+    return {
+        'fixed_timesteps': int(len(lengths) * fixed_length),
+        'bucketed_timesteps': bucketed_steps,
+        'real_timesteps': int(np.minimum(lengths, boundaries[-1]).sum()),
+        'fixed_batch_mb': min(len(lengths), batch_size) * fixed_length * n_features * 4 / 1e6,
+        'bucketed_batch_mb': largest_batch * n_features * 4 / 1e6,
+        'bucket_sizes': sizes.tolist(),
+    }
+
+
+# source: RaggedSource; indices: sequences in this split; Y: labels aligned with indices, or
+# {head: labels}. Batches never mix buckets; with shuffle, sequences are shuffled within their
+# bucket and the batch order is shuffled, with a fixed seed per epoch.
+def make_bucketed_dataset(source, Y, indices, boundaries, batch_size=32, shuffle=False, seed=None, prefetch=tf.data.AUTOTUNE):
+    indices = np.asarray(indices, dtype=np.int64)
+    heads = list(Y) if isinstance(Y, dict) else None
+    labels = [np.asarray(Y[head], dtype=np.float32) for head in heads] if heads else [np.asarray(Y, dtype=np.float32)]
+    buckets = assign_buckets(source.lengths[indices], boundaries)
+    epoch = [0]
+
+    def batches():
+        rng = np.random.default_rng(None if seed is None else seed + epoch[0])
+        epoch[0] += 1
+        plan = []
+        for bucket in range(len(boundaries)):
+            members = np.flatnonzero(buckets == bucket)
+            if shuffle:
+                members = rng.permutation(members)
+            plan.extend((bucket, members[i:i + batch_size]) for i in range(0, len(members), batch_size))
+        if shuffle:
+            plan = [plan[i] for i in rng.permutation(len(plan))]
+        for bucket, positions in plan:
+            X = source.padded(indices[positions], int(boundaries[bucket]), align='start')
+            y = [label[positions] for label in labels]
+            yield X, (dict(zip(heads, y)) if heads else y[0])
+
+    label_specs = [tf.TensorSpec((None,) + label.shape[1:], tf.float32) for label in labels]
+    signature = (tf.TensorSpec((None, None, source.shape[2]), tf.float32),
+                 dict(zip(heads, label_specs)) if heads else label_specs[0])
+    return tf.data.Dataset.from_generator(batches, output_signature=signature).prefetch(prefetch)
+
+
+# Predicts start-aligned padded sequences bucket by bucket (each bucket sliced to its boundary)
+# and returns the predictions in the original order.
+def predict_bucketed(predict, X, boundaries, batch_size):
+    lengths = (X != pad_value).any(axis=2).sum(axis=1)
+    buckets = assign_buckets(lengths, boundaries)
+    results = None
+    for bucket in np.unique(buckets):
+        members = np.flatnonzero(buckets == bucket)
+        predicted = predict(X[members, :int(boundaries[bucket])], batch_size)
+        if results is None:
+            results = {head: np.empty((len(X),) + p.shape[1:], p.dtype) for head, p in predicted.items()}
+        for head, p in predicted.items():
+            results[head][members] = p
+    return results
+
+
+# ==============================
+# Mask-Aware Pooling
+# ==============================
+# Global average over the timesteps that come from real rows only. The valid input length is the
+# number of non-pad timesteps (rows are start-aligned), carried through the conv/pool stack.
+# Inputs shorter than min_input_length still use the first output timestep.
+@tf.keras.utils.register_keras_serializable(package='second_kaggle')
+class MaskedGlobalAveragePooling1D(layers.Layer):
+    def __init__(self, kernel_sizes, pool_size=3, **kwargs):
+        super().__init__(**kwargs)
+        self.kernel_sizes = list(kernel_sizes)
+        self.pool_size = pool_size
+
+    def call(self, features, inputs):
+        valid = tf.reduce_sum(tf.cast(tf.reduce_any(tf.not_equal(inputs, pad_value), axis=-1), tf.int32), axis=1)
+        for kernel_size in self.kernel_sizes:
+            valid = (valid - kernel_size + 1) // self.pool_size
+        steps = tf.shape(features)[1]
+        valid = tf.clip_by_value(valid, 1, steps)
+        mask = tf.sequence_mask(valid, steps, dtype=features.dtype)
+        return tf.reduce_sum(features * mask[:, :, None], axis=1) / tf.cast(valid, features.dtype)[:, None]
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(kernel_sizes=self.kernel_sizes, pool_size=self.pool_size)
+        return config
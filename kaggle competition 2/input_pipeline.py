@@ -0,0 +1,114 @@
+import os
+import time
+import numpy as np
+import tensorflow as tf
+from sequence_data import pad_value, target_positions
+
+# ==============================
+# tf.data Input Pipeline
+# ==============================
+# Batches are gathered from a padded (N, L, 6) array (in memory or np.load(..., mmap_mode='r'))
+# or, with a RaggedSource, padded/cropped on the fly from the raw rows, so the full padded
+# tensor never has to be materialized. Shuffling uses a fixed seed and batches are prefetched
+# while the model trains on the previous one.
+
+
+# Raw rows sorted by data_id plus offsets: sequence i is values[offsets[i]:offsets[i + 1]].
+class RaggedSource:
+    def __init__(self, values, offsets, fixed_length):
+        self.values = values
+        self.offsets = np.asarray(offsets)
+        self.fixed_length = fixed_length
+        self.shape = (len(self.offsets) - 1, fixed_length, values.shape[1])
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    # Center-pad / center-crop only the requested sequences (same layout as preprocess_sequences)
+    def __getitem__(self, seq_indices):
+        return self.padded(seq_indices, self.fixed_length)
+
+    # Pad / crop the requested sequences to `length`; align='start' pads at the end (bucketed batches)
+    def padded(self, seq_indices, length, align='center'):
+        starts = self.offsets[seq_indices]
+        lengths = self.offsets[np.asarray(seq_indices) + 1] - starts
+        seq_pos = np.repeat(np.arange(len(starts)), lengths)
+        step_in_seq = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = target_positions(step_in_seq, lengths[seq_pos], length, align)
+        keep = positions >= 0
+
+        X = np.full((len(starts), length, self.values.shape[1]), pad_value, dtype=np.float32)
+        X[seq_pos[keep], positions[keep]] = self.values[starts[seq_pos[keep]] + step_in_seq[keep]]
+        return X
+
+
+# Ragged rows for sequences kept in memory (e.g. built from a scaled DataFrame sorted by data_id)
+def ragged_from_frame(data, feature_cols, fixed_length):
+    data = data.sort_values('data_id', kind='stable')
+    _, lengths = np.unique(data['data_id'].to_numpy(), return_counts=True)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    return RaggedSource(data[feature_cols].to_numpy(dtype=np.float32), offsets, fixed_length)
+
+
+# X: padded array or RaggedSource; indices: rows of X in this split;
+# Y: labels aligned with indices, or {head: labels} for multi-task models.
+def make_dataset(X, Y, indices, batch_size=32, shuffle=False, seed=None, prefetch=tf.data.AUTOTUNE):
+    indices = np.asarray(indices, dtype=np.int64)
+    heads = list(Y) if isinstance(Y, dict) else None
+    labels = [Y[head] for head in heads] if heads else [Y]
+
+    def gather(positions):
+        rows = indices[positions]
+        order = np.argsort(rows)  # sequential reads from memory-mapped files, then restore batch order
+        X_batch = np.empty((len(rows),) + tuple(X.shape[1:]), dtype=np.float32)
+        X_batch[order] = X[rows[order]]
+        return [X_batch] + [np.asarray(label[positions], dtype=np.float32) for label in labels]
+
+    def load_batch(positions):
+        tensors = tf.numpy_function(gather, [positions], [tf.float32] * (1 + len(labels)))
+        tensors[0].set_shape((None,) + tuple(X.shape[1:]))
+        for tensor, label in zip(tensors[1:], labels):
+            tensor.set_shape((None,) + tuple(np.shape(label)[1:]))
+        y = dict(zip(heads, tensors[1:])) if heads else tensors[1]
+        return tensors[0], y
+
+    dataset = tf.data.Dataset.range(len(indices))
+    if shuffle:
+        dataset = dataset.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size).map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+
+    options = tf.data.Options()
+    options.deterministic = True  # keep batch order reproducible even with parallel map
+    dataset = dataset.with_options(options)
+    return dataset.prefetch(prefetch)
+
+
+# Thread counts for TF ops; must run before TensorFlow executes its first op.
+# Op determinism keeps results reproducible for any thread count.
+def configure_threads(intra_op=None, inter_op=None):
+    if intra_op:
+        os.environ['OMP_NUM_THREADS'] = str(intra_op)
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op)
+    if inter_op:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op)
+    tf.config.experimental.enable_op_determinism()
+
+
+# Logs training throughput (samples/sec) for every epoch
+class ThroughputLogger(tf.keras.callbacks.Callback):
+    def __init__(self, n_samples):
+        super().__init__()
+        self.n_samples = n_samples
+        self.samples_per_sec = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        rate = self.n_samples / (time.perf_counter() - self.start)
+        self.samples_per_sec.append(rate)
+        print(f" - {rate:.1f} samples/sec")
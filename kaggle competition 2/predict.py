@@ -0,0 +1,107 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sequence_data import iter_padded_sequences
+from tflite_export import TFLiteModel, tflite_path, quantization_modes
+from bucketing import predict_bucketed
+
+# ==============================
+# Batch Prediction
+# ==============================
+# Loads the models and scaler statistics saved by second_kaggle.py, streams the input CSV
+# in chunks, scores each chunk of complete sequences with a batched Keras predict and
+# appends the rows to the output CSV. Memory stays flat regardless of the input size.
+#   python predict.py --input test_data.csv --output submission_cnn.csv --chunksize 1000000
+# --tflite dynamic|int8|float32 uses the models exported by tflite_export.py instead of Keras.
+# Models trained with --bucketed (variable input length) are scored bucket by bucket: sequences
+# are start-aligned, padded to the longest bucket and each bucket is sliced to its boundary.
+
+per_task_models = {"gender": "Gender_Model", "experience": "Experience_Model", "hand": "Hand_Model", "level": "Level_Model"}
+
+
+def load_model(model_dir, name, tflite=None):
+    if tflite:
+        return TFLiteModel(tflite_path(model_dir, name, tflite))
+    return tf.keras.models.load_model(os.path.join(model_dir, f"{name}.keras"), compile=False)
+
+
+def model_predict(model, X, batch_size):
+    if isinstance(model, TFLiteModel):
+        return model.predict(X, batch_size)
+    return model.predict(X, batch_size=batch_size, verbose=0)
+
+
+# Returns a function mapping a padded batch to {head: predictions}, the padded length and the
+# alignment iter_padded_sequences should use for it
+def load_predictor(model_dir, multitask=None, tflite=None):
+    suffix = f".{tflite}.tflite" if tflite else ".keras"
+    if multitask is None:
+        multitask = os.path.exists(os.path.join(model_dir, f"MultiTask_Model{suffix}"))
+    if multitask:
+        model = load_model(model_dir, "MultiTask_Model", tflite)
+        predict, fixed_length = (lambda X, batch_size: model_predict(model, X, batch_size)), model.input_shape[1]
+    else:
+        heads = {head: load_model(model_dir, name, tflite) for head, name in per_task_models.items()}
+        fixed_length = next(iter(heads.values())).input_shape[1]
+        predict = lambda X, batch_size: {head: model_predict(model, X, batch_size) for head, model in heads.items()}
+
+    if fixed_length is not None:
+        return predict, fixed_length, 'center'
+    boundaries = np.load(os.path.join(model_dir, "bucket_boundaries.npy"))
+    return (lambda X, batch_size: predict_bucketed(predict, X, boundaries, batch_size)), int(boundaries[-1]), 'start'
+
+
+# Same column layout as the first competition's submission_lgb.csv
+def submission_frame(data_ids, predictions):
+    experience, level = predictions['experience'], predictions['level']
+    return pd.DataFrame({
+        'data_id': data_ids,
+        'gender': predictions['gender'][:, 0],
+        'hold racket handed': predictions['hand'][:, 0],
+        'play years_0': experience[:, 0],
+        'play years_1': experience[:, 1],
+        'play years_2': experience[:, 2],
+        'level_0': level[:, 0],
+        'level_1': level[:, 1],
+        'level_2': level[:, 2],
+    })
+
+
+def predict_csv(input_path, output_path, model_dir='models', chunksize=1_000_000, batch_size=256, multitask=None, tflite=None):
+    predict, fixed_length, align = load_predictor(model_dir, multitask, tflite)
+    stats = np.load(os.path.join(model_dir, "scaler_stats.npz"))
+
+    total_rows, total_sequences, first = 0, 0, True
+    start = chunk_start = time.perf_counter()
+    for X, data_ids, n_rows in iter_padded_sequences(input_path, stats['mean'], stats['scale'], fixed_length, chunksize, align=align):
+        predicted = submission_frame(data_ids, predict(X, batch_size))
+        predicted.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+        first = False
+
+        total_rows += n_rows
+        total_sequences += len(data_ids)
+        elapsed = time.perf_counter() - chunk_start
+        print(f"{total_sequences} sequences written: {n_rows / elapsed:.0f} rows/sec, {len(data_ids) / elapsed:.1f} sequences/sec")
+        chunk_start = time.perf_counter()
+
+    elapsed = time.perf_counter() - start
+    print(f"Predicted {total_sequences} sequences ({total_rows} rows) in {elapsed:.2f}s "
+          f"({total_rows / elapsed:.0f} rows/sec, {total_sequences / elapsed:.1f} sequences/sec) -> {output_path}")
+    return total_sequences
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--input', default='test_data.csv')
+    parser.add_argument('--output', default='submission_cnn.csv')
+    parser.add_argument('--model-dir', default='models', help="--model-dir used by second_kaggle.py")
+    parser.add_argument('--chunksize', type=int, default=1_000_000, help="CSV rows read per chunk")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--per-task', action='store_true', help="use the four per-task models even if a multi-task model exists")
+    parser.add_argument('--tflite', choices=quantization_modes, help="use the TFLite models exported by tflite_export.py")
+    args = parser.parse_args()
+
+    predict_csv(args.input, args.output, args.model_dir, args.chunksize, args.batch_size, False if args.per_task else None, args.tflite)
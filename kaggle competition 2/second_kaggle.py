@@ -1,4 +1,5 @@
 import os
+import time
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
@@ -9,6 +10,12 @@ from tensorflow.keras import layers, models, initializers, regularizers
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import CategoricalCrossentropy, BinaryCrossentropy
+from sequence_data import feature_cols, fixed_length, pad_value, preprocess_frame, load_streaming
+from input_pipeline import ragged_from_frame, make_dataset, configure_threads, ThroughputLogger
+from swing_features import extract_frame, train_feature_models
+from bucketing import (MaskedGlobalAveragePooling1D, make_bucketed_dataset, bucket_boundaries, bucket_order,
+                       min_input_length, padding_stats)
+from predict import submission_frame
 
 # ==============================
 # Constants and Setup
@@ -23,104 +30,297 @@ os.environ['OMP_NUM_THREADS'] = '1'
 # ==============================
 # Data Loading and Preprocessing
 # ==============================
-train_features = pd.read_csv('train_data.csv')
-train_labels = pd.read_csv('train_info.csv')
-test_features = pd.read_csv('test_data.csv')
-
-# Standardization
-feature_cols = ["Ax", "Ay", "Az", "Gx", "Gy", "Gz"]
-scaler = StandardScaler()
-train_features[feature_cols] = scaler.fit_transform(train_features[feature_cols])
-test_features[feature_cols] = scaler.transform(test_features[feature_cols])
-
-# Grouping Data by data_id
-def group_data(data):
-    return data.groupby('data_id')[feature_cols].apply(lambda x: x.values)
-
-train_grouped = group_data(train_features)
-test_grouped = group_data(test_features)
-
-# Padding and Truncation
-def preprocess_sequences(data, fixed_length):
-    processed = []
-    for seq in data:
-        seq_len = len(seq)
-        if seq_len < fixed_length:
-            pad_len = fixed_length - seq_len
-            left_pad, right_pad = pad_len // 2, pad_len - (pad_len // 2)
-            seq = np.pad(seq, ((left_pad, right_pad), (0, 0)), mode='constant', constant_values=-999999)
-        else:
-            start_idx = (seq_len - fixed_length) // 2
-            seq = seq[start_idx:start_idx + fixed_length]
-        processed.append(seq)
-    return np.array(processed)
+def load_in_memory():
+    train_features = pd.read_csv('train_data.csv')
+    test_features = pd.read_csv('test_data.csv')
+
+    # Standardization
+    scaler = StandardScaler()
+    train_features[feature_cols] = scaler.fit_transform(train_features[feature_cols])
+    test_features[feature_cols] = scaler.transform(test_features[feature_cols])
+
+    # Padding and Truncation (vectorized; same result as group_data + preprocess_sequences)
+    X_train, _ = preprocess_frame(train_features, fixed_length)
+    X_test, _ = preprocess_frame(test_features, fixed_length)
+    return X_train, X_test, (scaler.mean_, scaler.scale_)
+
+
+# Chunked CSV reads written straight into memory-mapped (N, 1000, 6) float32 arrays;
+# the test set is scaled with the train statistics.
+def load_streamed(cache_dir='sequence_cache', chunksize=1_000_000):
+    X_train, _, scaler_stats = load_streaming('train_data.csv', cache_dir, 'train', chunksize=chunksize)
+    X_test, _, _ = load_streaming('test_data.csv', cache_dir, 'test', scaler_stats=scaler_stats, chunksize=chunksize)
+    return X_train, X_test, scaler_stats
+
 
-fixed_length = 1000
-X_train = preprocess_sequences(train_grouped, fixed_length)
-X_test = preprocess_sequences(test_grouped, fixed_length)
-Y = train_labels.iloc[:, 1:].values
+# Scaled raw rows without padding; batches are padded/cropped on the fly by the tf.data pipeline.
+def load_ragged():
+    train_features = pd.read_csv('train_data.csv')
+    test_features = pd.read_csv('test_data.csv')
 
-# Train-Test Split
-X_train, X_val, Y_train, Y_val = train_test_split(X_train, Y, test_size=0.2, random_state=SEED, shuffle=True)
+    scaler = StandardScaler()
+    train_features[feature_cols] = scaler.fit_transform(train_features[feature_cols])
+    test_features[feature_cols] = scaler.transform(test_features[feature_cols])
+    return (ragged_from_frame(train_features, feature_cols, fixed_length),
+            ragged_from_frame(test_features, feature_cols, fixed_length), (scaler.mean_, scaler.scale_))
+
+
+# Handcrafted per-data_id features from the raw (unscaled) rows for the LightGBM path.
+def load_features():
+    return extract_frame(pd.read_csv('train_data.csv')), extract_frame(pd.read_csv('test_data.csv'))
 
 # ==============================
 # Model Definition
 # ==============================
-def create_cnn_model(input_shape, num_classes, name):
+# (filters, kernel_size) of the five Conv1D stages shared by every model
+conv_blocks = [(64, 3), (128, 3), (256, 3), (512, 5), (1024, 3)]
+
+# Masking + Conv1D stack + global average pooling. With mask_aware (length-bucketed batches, input
+# length None) the pooling averages only the timesteps computed from real rows.
+def pooled_features(inputs, initializer, mask_aware=False):
+    x = layers.Masking(mask_value=pad_value)(inputs)
+    for filters, kernel_size in conv_blocks:
+        x = layers.Conv1D(filters, kernel_size=kernel_size, kernel_initializer=initializer)(x)
+        x = layers.LeakyReLU(0.1)(x)
+        x = layers.MaxPooling1D(pool_size=3)(x)
+    if mask_aware:
+        return MaskedGlobalAveragePooling1D([kernel_size for _, kernel_size in conv_blocks])(x, inputs)
+    return layers.GlobalAveragePooling1D()(x)
+
+def create_cnn_model(input_shape, num_classes, name, mask_aware=False):
     initializer = initializers.GlorotUniform(seed=SEED)
+    if mask_aware:
+        inputs = layers.Input(shape=input_shape)
+        h = layers.Dense(64, kernel_initializer=initializer, kernel_regularizer=regularizers.L1(0.1))(pooled_features(inputs, initializer, True))
+        h = layers.LeakyReLU(0.1)(h)
+        outputs = layers.Dense(num_classes, activation='softmax' if num_classes > 2 else 'sigmoid', kernel_initializer=initializer)(h)
+        return models.Model(inputs, outputs, name=name)
+
     model = models.Sequential(name=name)
-    model.add(layers.Masking(mask_value=-999999, input_shape=input_shape))
-    model.add(layers.Conv1D(64, kernel_size=3, kernel_initializer=initializer))
-    model.add(layers.LeakyReLU(0.1))
-    model.add(layers.MaxPooling1D(pool_size=3))
-    model.add(layers.Conv1D(128, kernel_size=3, kernel_initializer=initializer))
-    model.add(layers.LeakyReLU(0.1))
-    model.add(layers.MaxPooling1D(pool_size=3))
-    model.add(layers.Conv1D(256, kernel_size=3, kernel_initializer=initializer))
-    model.add(layers.LeakyReLU(0.1))
-    model.add(layers.MaxPooling1D(pool_size=3))
-    model.add(layers.Conv1D(512, kernel_size=5, kernel_initializer=initializer))
-    model.add(layers.LeakyReLU(0.1))
-    model.add(layers.MaxPooling1D(pool_size=3))
-    model.add(layers.Conv1D(1024, kernel_size=3, kernel_initializer=initializer))
-    model.add(layers.LeakyReLU(0.1))
-    model.add(layers.MaxPooling1D(pool_size=3))
+    model.add(layers.Masking(mask_value=pad_value, input_shape=input_shape))
+    for filters, kernel_size in conv_blocks:
+        model.add(layers.Conv1D(filters, kernel_size=kernel_size, kernel_initializer=initializer))
+        model.add(layers.LeakyReLU(0.1))
+        model.add(layers.MaxPooling1D(pool_size=3))
     model.add(layers.GlobalAveragePooling1D())
     model.add(layers.Dense(64, kernel_initializer=initializer, kernel_regularizer=regularizers.L1(0.1)))
     model.add(layers.LeakyReLU(0.1))
     model.add(layers.Dense(num_classes, activation='softmax' if num_classes > 2 else 'sigmoid', kernel_initializer=initializer))
     return model
 
+# One shared convolutional backbone with a small Dense head per task.
+# heads: {head_name: num_classes}; the model outputs a dict keyed by head name.
+def create_multitask_model(input_shape, heads, name, mask_aware=False):
+    initializer = initializers.GlorotUniform(seed=SEED)
+    inputs = layers.Input(shape=input_shape)
+    features = pooled_features(inputs, initializer, mask_aware)
+
+    outputs = {}
+    for head, num_classes in heads.items():
+        h = layers.Dense(64, kernel_initializer=initializer, kernel_regularizer=regularizers.L1(0.1))(features)
+        h = layers.LeakyReLU(0.1)(h)
+        outputs[head] = layers.Dense(num_classes, activation='softmax' if num_classes > 2 else 'sigmoid',
+                                     kernel_initializer=initializer, name=head)(h)
+    return models.Model(inputs, outputs, name=name)
+
 # ==============================
 # Training and Evaluation
 # ==============================
+def task_loss(num_classes):
+    return CategoricalCrossentropy(label_smoothing=0.1) if num_classes > 2 else BinaryCrossentropy(label_smoothing=0.1)
+
+def task_auc(Y_true, Y_pred, num_classes):
+    return roc_auc_score(Y_true, Y_pred, average='micro', multi_class='ovr') if num_classes > 2 else roc_auc_score(Y_true, Y_pred)
+
+# num_classes is an int for a single-task model, or {head: num_classes} for a multi-task
+# model (Y_train / Y_val are then dicts keyed by head; the combined loss is the sum of head losses).
+# X_train / X_val may also be tf.data datasets from make_dataset (Y_val is still needed for ROC-AUC).
 def train_and_evaluate(name, model, X_train, X_val, Y_train, Y_val, num_classes, epochs=100, batch_size=32, patience=10):
     early_stopping = EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True, verbose=1)
     lr_scheduler = ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, verbose=1)
-    loss_fn = CategoricalCrossentropy(label_smoothing=0.1) if num_classes > 2 else BinaryCrossentropy(label_smoothing=0.1)
-    model.compile(optimizer=Adam(learning_rate=0.001), loss=loss_fn, metrics=['accuracy'])
-    history = model.fit(X_train, Y_train, validation_data=(X_val, Y_val), epochs=epochs, batch_size=batch_size, callbacks=[early_stopping, lr_scheduler], verbose=1)
+    n_train = len(next(iter(Y_train.values())) if isinstance(Y_train, dict) else Y_train)
+    throughput = ThroughputLogger(n_train)
+    multitask = isinstance(num_classes, dict)
+    if multitask:
+        loss_fn = {head: task_loss(n) for head, n in num_classes.items()}
+        metrics = {head: ['accuracy'] for head in num_classes}
+    else:
+        loss_fn = task_loss(num_classes)
+        metrics = ['accuracy']
+    model.compile(optimizer=Adam(learning_rate=0.001), loss=loss_fn, metrics=metrics)
+    if isinstance(X_train, tf.data.Dataset):
+        history = model.fit(X_train, validation_data=X_val, epochs=epochs, callbacks=[early_stopping, lr_scheduler, throughput], verbose=1)
+    else:
+        history = model.fit(X_train, Y_train, validation_data=(X_val, Y_val), epochs=epochs, batch_size=batch_size, callbacks=[early_stopping, lr_scheduler, throughput], verbose=1)
+    print(f"{name} mean training throughput: {np.mean(throughput.samples_per_sec):.1f} samples/sec")
     Y_pred = model.predict(X_val)
-    auc_score = roc_auc_score(Y_val, Y_pred, average='micro', multi_class='ovr') if num_classes > 2 else roc_auc_score(Y_val, Y_pred)
-    print(f"{name} Validation ROC-AUC: {auc_score:.4f}")
+    if multitask:
+        auc_score = {head: task_auc(Y_val[head], Y_pred[head], n) for head, n in num_classes.items()}
+        for head, score in auc_score.items():
+            print(f"{name} [{head}] Validation ROC-AUC: {score:.4f}")
+    else:
+        auc_score = task_auc(Y_val, Y_pred, num_classes)
+        print(f"{name} Validation ROC-AUC: {auc_score:.4f}")
     return history, auc_score
 
 # ==============================
 # Model Training
 # ==============================
-models_and_tasks = [
-    ("Gender_Model", 1, Y_train[:, 0].reshape(-1, 1), Y_val[:, 0].reshape(-1, 1)),
-    ("Experience_Model", 3, tf.keras.utils.to_categorical(Y_train[:, 1], 3), tf.keras.utils.to_categorical(Y_val[:, 1], 3)),
-    ("Hand_Model", 1, Y_train[:, 2].reshape(-1, 1), Y_val[:, 2].reshape(-1, 1)),
-    ("Level_Model", 3, tf.keras.utils.to_categorical(Y_train[:, 3], 3), tf.keras.utils.to_categorical(Y_val[:, 3], 3)),
-]
-
-for name, num_classes, Y_task_train, Y_task_val in models_and_tasks:
-    print(f"\nTraining {name}...")
-    model = create_cnn_model((X_train.shape[1], X_train.shape[2]), num_classes, name)
-    history, auc = train_and_evaluate(name, model, X_train, X_val, Y_task_train, Y_task_val, num_classes)
+if __name__ == '__main__':
+    import argparse
 
-# ==============================
-# Summary
-# ==============================
-print("\nTraining Completed. Models and AUC scores are printed above.")
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streaming', action='store_true', help="read CSVs in chunks into memory-mapped arrays")
+    parser.add_argument('--chunksize', type=int, default=1_000_000)
+    parser.add_argument('--cache-dir', default='sequence_cache')
+    parser.add_argument('--multitask', action='store_true', help="train one shared backbone with four heads")
+    parser.add_argument('--compare', action='store_true', help="train the multi-task, per-task and GBDT models and compare")
+    parser.add_argument('--gbdt', action='store_true', help="train LightGBM on handcrafted swing features instead of the CNN")
+    parser.add_argument('--auc-tolerance', type=float, default=0.01, help="--compare: pick GBDT when its ROC-AUC is this close to the CNN")
+    parser.add_argument('--tf-data', action='store_true', help="feed training through a shuffled, prefetched tf.data pipeline")
+    parser.add_argument('--on-the-fly', action='store_true', help="keep raw rows and pad/crop each batch on the fly (implies --tf-data)")
+    parser.add_argument('--bucketed', action='store_true', help="batch sequences by length buckets padded to the bucket boundary (implies --on-the-fly)")
+    parser.add_argument('--buckets', type=int, default=4, help="--bucketed: number of length buckets")
+    parser.add_argument('--max-length', type=int, default=fixed_length, help="--bucketed: longest bucket; longer sequences are center-cropped as before")
+    parser.add_argument('--intra-threads', type=int, help="TF intra-op threads (default: OMP_NUM_THREADS=1)")
+    parser.add_argument('--inter-threads', type=int, help="TF inter-op threads")
+    parser.add_argument('--model-dir', default='models', help="trained models and scaler statistics are saved here for predict.py")
+    args = parser.parse_args()
+
+    configure_threads(args.intra_threads, args.inter_threads)
+    run_cnn = not args.gbdt or args.compare
+    os.makedirs(args.model_dir, exist_ok=True)
+    train_labels = pd.read_csv('train_info.csv')
+    Y = train_labels.iloc[:, 1:].values
+
+    # Train-Test Split (split row indices so memory-mapped / ragged sources are not copied)
+    idx_train, idx_val, Y_train, Y_val = train_test_split(np.arange(len(Y)), Y, test_size=0.2, random_state=SEED, shuffle=True)
+
+    if run_cnn:
+        start = time.perf_counter()
+        if args.on_the_fly or args.bucketed:
+            X_all, X_test, scaler_stats = load_ragged()
+        elif args.streaming:
+            X_all, X_test, scaler_stats = load_streamed(args.cache_dir, args.chunksize)
+        else:
+            X_all, X_test, scaler_stats = load_in_memory()
+        load_time = time.perf_counter() - start
+        np.savez(os.path.join(args.model_dir, "scaler_stats.npz"), mean=scaler_stats[0], scale=scaler_stats[1])
+
+        if args.bucketed:
+            lengths = X_all.lengths
+            boundaries = bucket_boundaries(lengths[idx_train], args.buckets, min_input_length([k for _, k in conv_blocks]), args.max_length)
+            np.save(os.path.join(args.model_dir, "bucket_boundaries.npy"), boundaries)
+            stats = padding_stats(lengths, boundaries, 32, fixed_length)
+            print(f"Length buckets {boundaries.tolist()} hold {stats['bucket_sizes']} sequences: "
+                  f"{stats['bucketed_timesteps'] / stats['fixed_timesteps']:.1%} of the padded timesteps of fixed_length={fixed_length}, "
+                  f"largest batch {stats['bucketed_batch_mb']:.1f} MB vs {stats['fixed_batch_mb']:.1f} MB")
+
+            # Validation batches come out grouped by bucket; keep labels in the same order
+            order = bucket_order(lengths[idx_val], boundaries)
+            idx_val, Y_val = idx_val[order], Y_val[order]
+
+            def task_inputs(Y_task_train, Y_task_val):
+                return (make_bucketed_dataset(X_all, Y_task_train, idx_train, boundaries, batch_size=32, shuffle=True, seed=SEED),
+                        make_bucketed_dataset(X_all, Y_task_val, idx_val, boundaries, batch_size=32))
+        elif args.tf_data or args.on_the_fly:
+            def task_inputs(Y_task_train, Y_task_val):
+                return (make_dataset(X_all, Y_task_train, idx_train, batch_size=32, shuffle=True, seed=SEED),
+                        make_dataset(X_all, Y_task_val, idx_val, batch_size=32))
+        else:
+            X_train, X_val = X_all[idx_train], X_all[idx_val]
+
+            def task_inputs(Y_task_train, Y_task_val):
+                return X_train, X_val
+
+        input_shape = (None if args.bucketed else X_all.shape[1], X_all.shape[2])
+
+    models_and_tasks = [
+        ("Gender_Model", 1, Y_train[:, 0].reshape(-1, 1), Y_val[:, 0].reshape(-1, 1)),
+        ("Experience_Model", 3, tf.keras.utils.to_categorical(Y_train[:, 1], 3), tf.keras.utils.to_categorical(Y_val[:, 1], 3)),
+        ("Hand_Model", 1, Y_train[:, 2].reshape(-1, 1), Y_val[:, 2].reshape(-1, 1)),
+        ("Level_Model", 3, tf.keras.utils.to_categorical(Y_train[:, 3], 3), tf.keras.utils.to_categorical(Y_val[:, 3], 3)),
+    ]
+    head_names = {"Gender_Model": "gender", "Experience_Model": "experience", "Hand_Model": "hand", "Level_Model": "level"}
+    results = {}  # mode -> (load seconds, train seconds, predict seconds, {head: AUC})
+
+    if run_cnn and (args.multitask or args.compare):
+        print("\nTraining MultiTask_Model...")
+        heads = {head_names[name]: num_classes for name, num_classes, _, _ in models_and_tasks}
+        Y_heads_train = {head_names[name]: Y_task for name, _, Y_task, _ in models_and_tasks}
+        Y_heads_val = {head_names[name]: Y_task for name, _, _, Y_task in models_and_tasks}
+        start = time.perf_counter()
+        model = create_multitask_model(input_shape, heads, "MultiTask_Model", mask_aware=args.bucketed)
+        X_task_train, X_task_val = task_inputs(Y_heads_train, Y_heads_val)
+        history, auc = train_and_evaluate("MultiTask_Model", model, X_task_train, X_task_val, Y_heads_train, Y_heads_val, heads)
+        train_time = time.perf_counter() - start
+        start = time.perf_counter()
+        model.predict(X_task_val, verbose=0)
+        results['multi-task'] = (load_time, train_time, time.perf_counter() - start, auc)
+        model.save(os.path.join(args.model_dir, "MultiTask_Model.keras"))
+
+    if run_cnn and (not args.multitask or args.compare):
+        train_time, predict_time, aucs = 0.0, 0.0, {}
+        for name, num_classes, Y_task_train, Y_task_val in models_and_tasks:
+            print(f"\nTraining {name}...")
+            start = time.perf_counter()
+            model = create_cnn_model(input_shape, num_classes, name, mask_aware=args.bucketed)
+            X_task_train, X_task_val = task_inputs(Y_task_train, Y_task_val)
+            history, aucs[head_names[name]] = train_and_evaluate(name, model, X_task_train, X_task_val, Y_task_train, Y_task_val, num_classes)
+            train_time += time.perf_counter() - start
+            start = time.perf_counter()
+            model.predict(X_task_val, verbose=0)
+            predict_time += time.perf_counter() - start
+            model.save(os.path.join(args.model_dir, f"{name}.keras"))
+        results['per-task'] = (load_time, train_time, predict_time, aucs)
+
+    # ==============================
+    # LightGBM on Handcrafted Features
+    # ==============================
+    if args.gbdt or args.compare:
+        print("\nTraining LightGBM on handcrafted features...")
+        start = time.perf_counter()
+        train_features, test_features = load_features()
+        train_features = train_features.loc[train_labels.iloc[:, 0].values]  # same row order as train_info.csv
+        load_time = time.perf_counter() - start
+        print(f"Extracted {train_features.shape[1]} features for {len(train_features) + len(test_features)} sequences in {load_time:.2f}s")
+
+        tasks = {head_names[name]: (max(num_classes, 2), Y[:, k].astype(int)) for k, (name, num_classes, _, _) in enumerate(models_and_tasks)}
+        start = time.perf_counter()
+        gbdt_models = train_feature_models(train_features, tasks, idx_train, idx_val)
+        train_time = time.perf_counter() - start
+
+        aucs = {}
+        for name, num_classes, _, Y_task_val in models_and_tasks:
+            head = head_names[name]
+            booster, Y_pred = gbdt_models[head]
+            aucs[head] = task_auc(Y_task_val, Y_pred, num_classes)
+            print(f"GBDT [{head}] Validation ROC-AUC: {aucs[head]:.4f}")
+            booster.save_model(os.path.join(args.model_dir, f"{name}_GBDT.txt"))
+        start = time.perf_counter()
+        X_val_features = train_features.to_numpy(dtype=np.float32)[idx_val]
+        for booster, _ in gbdt_models.values():
+            booster.predict(X_val_features)
+        results['gbdt'] = (load_time, train_time, time.perf_counter() - start, aucs)
+
+        X_test_features = test_features.to_numpy(dtype=np.float32)
+        test_predictions = {head: booster.predict(X_test_features).reshape(len(X_test_features), -1) for head, (booster, _) in gbdt_models.items()}
+        submission_frame(test_features.index, test_predictions).to_csv('submission_gbdt.csv', index=False)
+        print("GBDT test predictions saved to submission_gbdt.csv")
+
+    # ==============================
+    # Summary
+    # ==============================
+    print(f"\nTraining Completed. Models and AUC scores are printed above; models saved to {args.model_dir}/.")
+    if args.compare:
+        print(f"\n{'mode':<12} {'load (s)':>9} {'train (s)':>10} {'predict (s)':>12} " + " ".join(f"{head:>11}" for head in head_names.values()))
+        for mode, (load_time, train_time, predict_time, aucs) in results.items():
+            print(f"{mode:<12} {load_time:>9.1f} {train_time:>10.1f} {predict_time:>12.2f} " + " ".join(f"{aucs[head]:>11.4f}" for head in head_names.values()))
+
+        # Per head, prefer the cheaper GBDT when its AUC is within --auc-tolerance of the best CNN
+        print(f"\nModel choice (GBDT if within {args.auc_tolerance} ROC-AUC of the best CNN):")
+        for head in head_names.values():
+            best_cnn = max(('multi-task', 'per-task'), key=lambda mode: results[mode][3][head])
+            gap = results[best_cnn][3][head] - results['gbdt'][3][head]
+            choice = 'gbdt' if gap <= args.auc_tolerance else best_cnn
+            print(f"  {head:<11} {choice:<11} (CNN - GBDT = {gap:+.4f})")
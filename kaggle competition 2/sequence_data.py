@@ -0,0 +1,166 @@
+import os
+import numpy as np
+import pandas as pd
+
+# ==============================
+# Sequence Data Utilities
+# ==============================
+feature_cols = ["Ax", "Ay", "Az", "Gx", "Gy", "Gz"]
+fixed_length = 1000
+pad_value = -999999
+
+
+# Grouping Data by data_id
+def group_data(data):
+    return data.groupby('data_id')[feature_cols].apply(lambda x: x.values)
+
+
+# Padding and Truncation
+def preprocess_sequences(data, fixed_length):
+    processed = []
+    for seq in data:
+        seq_len = len(seq)
+        if seq_len < fixed_length:
+            pad_len = fixed_length - seq_len
+            left_pad, right_pad = pad_len // 2, pad_len - (pad_len // 2)
+            seq = np.pad(seq, ((left_pad, right_pad), (0, 0)), mode='constant', constant_values=pad_value)
+        else:
+            start_idx = (seq_len - fixed_length) // 2
+            seq = seq[start_idx:start_idx + fixed_length]
+        processed.append(seq)
+    return np.array(processed)
+
+
+# Position of every row inside the fixed-length output (center pad / center crop).
+# align='start' pads at the end instead (length-bucketed batches); long sequences are still center-cropped.
+# Returns -1 for rows that fall outside the cropped window.
+def target_positions(step_in_seq, seq_len, fixed_length, align='center'):
+    pad_offset = (fixed_length - seq_len) // 2 if align == 'center' else 0
+    offset = np.where(seq_len < fixed_length, pad_offset, -((seq_len - fixed_length) // 2))
+    position = step_in_seq + offset
+    return np.where((position >= 0) & (position < fixed_length), position, -1)
+
+
+# Vectorized padding and truncation: the same output as group_data + preprocess_sequences,
+# built from group offsets and a single fancy-indexed write into one preallocated tensor.
+def preprocess_sequences_vectorized(values, data_ids, fixed_length, align='center'):
+    values = np.asarray(values)
+    data_ids = np.asarray(data_ids)
+    if len(data_ids) > 1 and not (data_ids[1:] >= data_ids[:-1]).all():
+        order = np.argsort(data_ids, kind='stable')  # keep the original row order within a data_id
+        values, data_ids = values[order], data_ids[order]
+
+    unique_ids, starts, lengths = np.unique(data_ids, return_index=True, return_counts=True)
+    seq_index = np.repeat(np.arange(len(unique_ids)), lengths)
+    step_in_seq = np.arange(len(data_ids)) - starts[seq_index]
+    positions = target_positions(step_in_seq, lengths[seq_index], fixed_length, align)
+    keep = positions >= 0
+
+    X = np.full((len(unique_ids), fixed_length, values.shape[1]), pad_value, dtype=values.dtype)
+    X[seq_index[keep], positions[keep]] = values[keep]
+    return X, unique_ids
+
+
+def preprocess_frame(data, fixed_length):
+    return preprocess_sequences_vectorized(data[feature_cols].to_numpy(), data['data_id'].to_numpy(), fixed_length)
+
+
+# ==============================
+# Streaming Ingestion
+# ==============================
+# Pass 1: sequence lengths per data_id and running mean/variance (Chan et al. merge),
+# so StandardScaler statistics never need the whole file in memory.
+def scan_sequences(csv_path, chunksize=1_000_000):
+    counts = {}
+    n, mean, m2 = 0, np.zeros(len(feature_cols)), np.zeros(len(feature_cols))
+    for chunk in pd.read_csv(csv_path, usecols=['data_id'] + feature_cols, chunksize=chunksize):
+        ids, id_counts = np.unique(chunk['data_id'].to_numpy(), return_counts=True)
+        for data_id, count in zip(ids.tolist(), id_counts.tolist()):
+            counts[data_id] = counts.get(data_id, 0) + count
+
+        values = chunk[feature_cols].to_numpy(dtype=np.float64)
+        chunk_n = len(values)
+        chunk_mean = values.mean(axis=0)
+        chunk_m2 = ((values - chunk_mean) ** 2).sum(axis=0)
+        delta = chunk_mean - mean
+        total = n + chunk_n
+        mean = mean + delta * chunk_n / total
+        m2 = m2 + chunk_m2 + delta ** 2 * n * chunk_n / total
+        n = total
+
+    data_ids = np.array(sorted(counts))
+    lengths = np.array([counts[data_id] for data_id in data_ids], dtype=np.int64)
+    scale = np.sqrt(m2 / n)
+    scale[scale == 0] = 1.0  # same as StandardScaler for constant columns
+    return data_ids, lengths, mean, scale
+
+
+# Pass 2: write each row straight into a preallocated (N, fixed_length, 6) float32
+# memory-mapped .npy file, using the same center-crop/center-pad layout as preprocess_sequences.
+def stream_sequences_to_memmap(csv_path, out_path, mean, scale, data_ids, lengths,
+                               fixed_length=fixed_length, chunksize=1_000_000):
+    X = np.lib.format.open_memmap(out_path, mode='w+', dtype=np.float32,
+                                  shape=(len(data_ids), fixed_length, len(feature_cols)))
+    X[:] = pad_value
+    seen = np.zeros(len(data_ids), dtype=np.int64)  # rows already written per sequence
+
+    for chunk in pd.read_csv(csv_path, usecols=['data_id'] + feature_cols, chunksize=chunksize):
+        rows = np.searchsorted(data_ids, chunk['data_id'].to_numpy())
+        step_in_seq = seen[rows] + chunk.groupby('data_id', sort=False).cumcount().to_numpy()
+        seen += np.bincount(rows, minlength=len(data_ids))
+
+        positions = target_positions(step_in_seq, lengths[rows], fixed_length)
+        keep = positions >= 0
+        values = (chunk[feature_cols].to_numpy(dtype=np.float64) - mean) / scale
+        X[rows[keep], positions[keep]] = values[keep]
+
+    X.flush()
+    return X
+
+
+# Streams one CSV into <cache_dir>/<name>_X.npy (+ data_ids). Train statistics are
+# computed on the first call and must be passed in for the test set.
+def load_streaming(csv_path, cache_dir, name, scaler_stats=None, fixed_length=fixed_length, chunksize=1_000_000):
+    os.makedirs(cache_dir, exist_ok=True)
+    data_ids, lengths, mean, scale = scan_sequences(csv_path, chunksize)
+    if scaler_stats is not None:
+        mean, scale = scaler_stats
+    else:
+        np.savez(os.path.join(cache_dir, "scaler_stats.npz"), mean=mean, scale=scale)
+
+    out_path = os.path.join(cache_dir, f"{name}_X.npy")
+    X = stream_sequences_to_memmap(csv_path, out_path, mean, scale, data_ids, lengths, fixed_length, chunksize)
+    np.save(os.path.join(cache_dir, f"{name}_data_ids.npy"), data_ids)
+    np.save(os.path.join(cache_dir, f"{name}_lengths.npy"), lengths)
+    return X, data_ids, (mean, scale)
+
+
+# ==============================
+# Streaming Inference Input
+# ==============================
+# Rows per data_id, counted in chunks (lengths decide centering, so they are needed up front).
+def count_sequence_lengths(csv_path, chunksize=1_000_000):
+    counts = pd.Series(dtype=np.int64)
+    for chunk in pd.read_csv(csv_path, usecols=['data_id'], chunksize=chunksize):
+        counts = counts.add(chunk['data_id'].value_counts(), fill_value=0)
+    return counts.astype(np.int64)
+
+
+# Yields (X, data_ids, n_rows) for every sequence whose rows have all been read, scaled with the train
+# statistics and padded/cropped like preprocess_sequences. Rows of sequences that continue
+# past a chunk boundary are carried into the next chunk, so memory stays bounded by chunksize
+# when the file is grouped by data_id.
+def iter_padded_sequences(csv_path, mean, scale, fixed_length=fixed_length, chunksize=1_000_000, lengths=None, align='center'):
+    lengths = count_sequence_lengths(csv_path, chunksize) if lengths is None else lengths
+    carry = None
+    for chunk in pd.read_csv(csv_path, usecols=['data_id'] + feature_cols, chunksize=chunksize):
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        rows_read = chunk['data_id'].map(chunk['data_id'].value_counts())
+        complete = (rows_read == chunk['data_id'].map(lengths)).to_numpy()
+        carry = chunk[~complete]
+        if complete.any():
+            done = chunk[complete]
+            values = ((done[feature_cols].to_numpy(dtype=np.float64) - mean) / scale).astype(np.float32)
+            X, data_ids = preprocess_sequences_vectorized(values, done['data_id'].to_numpy(), fixed_length, align)
+            yield X, data_ids, len(done)
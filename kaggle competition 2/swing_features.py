@@ -0,0 +1,206 @@
+import time
+import numpy as np
+import pandas as pd
+import lightgbm as lgb
+from sequence_data import feature_cols
+
+# ==============================
+# Handcrafted Swing Features
+# ==============================
+# Per-data_id features computed from the raw Ax..Gz rows in one grouped NumPy pass
+# (segment sums via bincount / reduceat, no Python loop over sequences):
+#   - mean / std / min / max over the whole swing and over n_windows equal time windows
+#   - quantiles (linear interpolation, same as np.quantile)
+#   - energy (mean of squares) and mean-crossing rate
+#   - FFT band power of the mean-removed signal, center-cropped/zero-padded to n_fft samples
+# A LightGBM model per task is trained on these features as a much cheaper alternative to the CNN.
+
+quantile_levels = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+
+def _segment_stats(values, segment, n_segments):
+    counts = np.bincount(segment, minlength=n_segments).astype(np.float64)
+    sums = np.stack([np.bincount(segment, values[:, c], minlength=n_segments) for c in range(values.shape[1])], axis=1)
+    squares = np.stack([np.bincount(segment, values[:, c] ** 2, minlength=n_segments) for c in range(values.shape[1])], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = sums / counts[:, None]
+    # second pass on the centered values: sqrt(E[x^2] - mean^2) cancels badly when |mean| >> std
+    centered = values - mean[segment]
+    deviations = np.stack([np.bincount(segment, centered[:, c] ** 2, minlength=n_segments) for c in range(values.shape[1])], axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        std = np.sqrt(deviations / counts[:, None])
+
+    # min / max with reduceat over the non-empty segments (rows are sorted by segment)
+    minimum = np.full((n_segments, values.shape[1]), np.nan)
+    maximum = np.full((n_segments, values.shape[1]), np.nan)
+    present = np.flatnonzero(counts)
+    starts = np.searchsorted(segment, present)
+    minimum[present] = np.minimum.reduceat(values, starts, axis=0)
+    maximum[present] = np.maximum.reduceat(values, starts, axis=0)
+    return mean, std, minimum, maximum, squares / np.maximum(counts, 1)[:, None]
+
+
+def _quantiles(values, seq_index, starts, lengths):
+    result = []
+    for c in range(values.shape[1]):
+        order = np.lexsort((values[:, c], seq_index))  # sort by value inside every sequence
+        sorted_values = values[order, c]
+        columns = []
+        for q in quantile_levels:
+            position = q * (lengths - 1)
+            lower = np.floor(position).astype(np.int64)
+            upper = np.minimum(lower + 1, lengths - 1)
+            fraction = position - lower
+            columns.append(sorted_values[starts + lower] * (1 - fraction) + sorted_values[starts + upper] * fraction)
+        result.append(np.stack(columns, axis=1))
+    return np.stack(result, axis=1)  # (N, channels, quantiles)
+
+
+def _band_power(values, mean, seq_index, step_in_seq, lengths, n_fft, n_bands):
+    # center-crop / zero-pad each mean-removed sequence to n_fft samples, then one batched rFFT
+    offset = np.where(lengths < n_fft, (n_fft - lengths) // 2, -((lengths - n_fft) // 2))
+    position = step_in_seq + offset[seq_index]
+    keep = (position >= 0) & (position < n_fft)
+    padded = np.zeros((len(lengths), n_fft, values.shape[1]), dtype=np.float32)
+    padded[seq_index[keep], position[keep]] = values[keep] - mean[seq_index[keep]]
+
+    power = np.abs(np.fft.rfft(padded, axis=1)) ** 2 / np.minimum(lengths, n_fft)[:, None, None]
+    edges = np.linspace(1, power.shape[1], n_bands + 1).astype(np.int64)  # skip the DC bin
+    return np.stack([power[:, lo:hi].sum(axis=1) for lo, hi in zip(edges[:-1], edges[1:])], axis=2)
+
+
+# values: (rows, 6) raw sensor rows; data_ids: data_id of every row.
+# Returns (features DataFrame indexed by the sorted unique data_id).
+def extract_features(values, data_ids, n_windows=4, n_fft=256, n_bands=8):
+    values = np.asarray(values, dtype=np.float64)
+    data_ids = np.asarray(data_ids)
+    if len(data_ids) > 1 and not (data_ids[1:] >= data_ids[:-1]).all():
+        order = np.argsort(data_ids, kind='stable')
+        values, data_ids = values[order], data_ids[order]
+
+    unique_ids, starts, lengths = np.unique(data_ids, return_index=True, return_counts=True)
+    n_seq, n_channels = len(unique_ids), values.shape[1]
+    seq_index = np.repeat(np.arange(n_seq), lengths)
+    step_in_seq = np.arange(len(data_ids)) - starts[seq_index]
+
+    blocks, names = [], []
+
+    def add(array, label):
+        blocks.append(array.reshape(n_seq, -1))
+        names.extend(f"{channel}_{label}" for channel in feature_cols)
+
+    mean, std, minimum, maximum, energy = _segment_stats(values, seq_index, n_seq)
+    for array, label in [(mean, 'mean'), (std, 'std'), (minimum, 'min'), (maximum, 'max'), (energy, 'energy')]:
+        add(array, label)
+
+    window = step_in_seq * n_windows // lengths[seq_index]
+    w_mean, w_std, w_min, w_max, _ = _segment_stats(values, seq_index * n_windows + window, n_seq * n_windows)
+    for w in range(n_windows):
+        for array, label in [(w_mean, 'mean'), (w_std, 'std'), (w_min, 'min'), (w_max, 'max')]:
+            add(array.reshape(n_seq, n_windows, n_channels)[:, w], f"w{w}_{label}")
+
+    quantiles = _quantiles(values, seq_index, starts, lengths)
+    for i, q in enumerate(quantile_levels):
+        add(quantiles[:, :, i], f"q{int(q * 100)}")
+
+    # mean-crossing rate: sign changes of (x - sequence mean) between consecutive rows of a sequence
+    above = values > mean[seq_index]
+    crossing = (above[1:] != above[:-1]) & (seq_index[1:] == seq_index[:-1])[:, None]
+    crossings = np.stack([np.bincount(seq_index[1:], crossing[:, c], minlength=n_seq) for c in range(n_channels)], axis=1)
+    add(crossings / np.maximum(lengths - 1, 1)[:, None], 'crossing_rate')
+
+    bands = _band_power(values, mean, seq_index, step_in_seq, lengths, n_fft, n_bands)
+    for b in range(n_bands):
+        add(bands[:, :, b], f"band{b}_power")
+
+    blocks.append(lengths[:, None].astype(np.float64))
+    names.append('length')
+    return pd.DataFrame(np.hstack(blocks), index=pd.Index(unique_ids, name='data_id'), columns=names)
+
+
+def extract_frame(data, **kwargs):
+    return extract_features(data[feature_cols].to_numpy(), data['data_id'].to_numpy(), **kwargs)
+
+
+# Pandas groupby reference used to check extract_features (slow, for verification only)
+def extract_features_reference(data, quantiles=quantile_levels):
+    grouped = data.groupby('data_id')[feature_cols]
+    reference = {}
+    for label, frame in [('mean', grouped.mean()), ('std', grouped.std(ddof=0)), ('min', grouped.min()), ('max', grouped.max())]:
+        for channel in feature_cols:
+            reference[f"{channel}_{label}"] = frame[channel]
+    for q in quantiles:
+        frame = grouped.quantile(q)
+        for channel in feature_cols:
+            reference[f"{channel}_q{int(q * 100)}"] = frame[channel]
+    return pd.DataFrame(reference)
+
+
+# Random swings with mixed lengths and a large per-channel offset (exercises the std cancellation)
+def synthetic_rows(n_sequences=200, min_length=5, max_length=400, seed=0):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(min_length, max_length + 1, n_sequences)
+    data = pd.DataFrame(rng.normal(size=(lengths.sum(), len(feature_cols))) + rng.uniform(-1e4, 1e4, len(feature_cols)),
+                        columns=feature_cols)
+    data['data_id'] = np.repeat(rng.permutation(n_sequences) + 1, lengths)
+    return data
+
+
+# Largest absolute difference between extract_frame and the pandas reference, per shared column
+def check_features(data, **kwargs):
+    features = extract_frame(data, **kwargs)
+    reference = extract_features_reference(data).loc[features.index]
+    return (features[reference.columns] - reference).abs().max()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="compare extract_features with the pandas groupby reference")
+    parser.add_argument('--input', help="raw rows CSV (e.g. train_data.csv); synthetic rows if omitted")
+    parser.add_argument('--sequences', type=int, default=200, help="synthetic sequence count")
+    parser.add_argument('--tolerance', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    data = pd.read_csv(args.input) if args.input else synthetic_rows(args.sequences)
+    errors = check_features(data)
+    worst = errors.idxmax()
+    print(f"{data['data_id'].nunique()} sequences, {len(errors)} columns checked, max abs error {errors[worst]:.3g} ({worst})")
+    if errors[worst] > args.tolerance:
+        raise SystemExit(f"extract_features differs from the reference by more than {args.tolerance}")
+
+
+# ==============================
+# LightGBM on Features
+# ==============================
+feature_params = {
+    'learning_rate': 0.05,
+    'num_leaves': 15,
+    'min_data_in_leaf': 10,
+    'feature_fraction': 0.8,
+    'bagging_fraction': 0.8,
+    'bagging_freq': 5,
+    'lambda_l2': 1.0,
+    'verbose': -1,
+    'seed': 30,
+}
+
+
+# tasks: {head: (num_classes, labels)} with integer labels; returns {head: (booster, validation probabilities)}
+def train_feature_models(features, tasks, idx_train, idx_val, num_boost_round=2000, early_stopping_rounds=100):
+    X = features.to_numpy(dtype=np.float32)
+    models = {}
+    for head, (num_classes, labels) in tasks.items():
+        params = dict(feature_params)
+        if num_classes > 2:
+            params.update(objective='multiclass', num_class=num_classes, metric='multi_logloss')
+        else:
+            params.update(objective='binary', metric='binary_logloss')
+        train_set = lgb.Dataset(X[idx_train], label=labels[idx_train], feature_name=list(features.columns))
+        valid_set = lgb.Dataset(X[idx_val], label=labels[idx_val], reference=train_set)
+        start = time.perf_counter()
+        booster = lgb.train(params, train_set, num_boost_round=num_boost_round, valid_sets=[valid_set],
+                            callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)])
+        print(f"GBDT [{head}] {booster.best_iteration} rounds in {time.perf_counter() - start:.2f}s")
+        models[head] = (booster, booster.predict(X[idx_val]))
+    return models
@@ -0,0 +1,183 @@
+import io
+import os
+import time
+import contextlib
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+from sequence_data import pad_value
+import bucketing  # registers MaskedGlobalAveragePooling1D for load_model
+
+# ==============================
+# TFLite Export
+# ==============================
+# Converts the saved Keras models to TFLite for CPU serving:
+#   float32 - plain conversion
+#   dynamic - int8 weights, float activations (no calibration data needed)
+#   int8    - int8 weights and activations, calibrated on a representative sample of the
+#             training tensor; inputs and outputs stay float32
+# The Masking layer only zeroes padded timesteps (Conv1D does not consume the mask), so the
+# exported graph drops it and TFLiteModel replaces pad_value with 0 before inference. This keeps
+# the -999999 pad value out of the int8 input calibration range.
+#   python tflite_export.py --model-dir models --modes dynamic int8
+
+quantization_modes = ['float32', 'dynamic', 'int8']
+
+
+def serving_model(model):
+    def clone_layer(layer):
+        if isinstance(layer, layers.Masking):
+            return layers.Identity(name=layer.name)
+        return layer.__class__.from_config(layer.get_config())
+
+    clone = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+def unmask(X):
+    X = np.asarray(X, dtype=np.float32)
+    return np.where(X == pad_value, np.float32(0), X)
+
+
+# Random single-sequence batches from the (padded) training tensor
+def representative_dataset(X, n_samples=200, seed=30):
+    indices = np.sort(np.random.default_rng(seed).choice(len(X), min(n_samples, len(X)), replace=False))
+
+    def generate():
+        for i in indices:
+            yield [unmask(X[i:i + 1])]
+    return generate
+
+
+def export_tflite(model, path, mode='int8', X_representative=None, n_samples=200):
+    if model.input_shape[1] is None:
+        raise ValueError(f"{model.name} takes variable-length (--bucketed) input; TFLite export needs a fixed-length model")
+    converter = tf.lite.TFLiteConverter.from_keras_model(serving_model(model))
+    if mode != 'float32':
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == 'int8':
+        if X_representative is None:
+            raise ValueError("int8 export needs a representative dataset (X_representative)")
+        converter.representative_dataset = representative_dataset(X_representative, n_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with contextlib.redirect_stdout(io.StringIO()):  # the converter prints the intermediate SavedModel signature
+        content = converter.convert()
+    with open(path, 'wb') as f:
+        f.write(content)
+    return path
+
+
+def tflite_path(model_dir, name, mode):
+    return os.path.join(model_dir, f"{name}.{mode}.tflite")
+
+
+# ==============================
+# TFLite Inference
+# ==============================
+# Batched inference through the model's serving signature. predict() returns an array for a
+# single-output model and {head: array} for the multi-task model, like Keras predict.
+class TFLiteModel:
+    def __init__(self, path, num_threads=None):
+        self.path = path
+        self._interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        signature = self._interpreter.get_signature_list()['serving_default']
+        self._input_name = signature['inputs'][0]
+        self.output_names = signature['outputs']
+        self._runner = self._interpreter.get_signature_runner()
+        self.input_shape = tuple(self._interpreter.get_input_details()[0]['shape_signature'])
+
+    def predict(self, X, batch_size=256):
+        outputs = {name: [] for name in self.output_names}
+        for start in range(0, len(X), batch_size):
+            # the runner resizes its input tensor when the batch size changes (e.g. the last batch)
+            result = self._runner(**{self._input_name: unmask(X[start:start + batch_size])})
+            for name in self.output_names:
+                outputs[name].append(result[name])
+        outputs = {name: np.concatenate(parts) for name, parts in outputs.items()}
+        return outputs if len(outputs) > 1 else next(iter(outputs.values()))
+
+
+# ==============================
+# Drift and Latency Report
+# ==============================
+def time_predict(predict, X, batch_size, single_samples=50):
+    predict(X[:batch_size])  # warm-up
+    start = time.perf_counter()
+    predictions = predict(X)
+    batched = (time.perf_counter() - start) / len(X)
+    sample = X[:1]
+    predict(sample)
+    start = time.perf_counter()
+    for _ in range(single_samples):
+        predict(sample)
+    single = (time.perf_counter() - start) / single_samples
+    return predictions, batched, single
+
+
+if __name__ == '__main__':
+    import argparse
+    import pandas as pd
+    from sklearn.model_selection import train_test_split
+    from second_kaggle import SEED, load_in_memory, task_auc
+    from predict import per_task_models
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model-dir', default='models', help="--model-dir used by second_kaggle.py")
+    parser.add_argument('--modes', nargs='+', choices=quantization_modes, default=['dynamic', 'int8'])
+    parser.add_argument('--samples', type=int, default=200, help="representative training sequences for int8 calibration")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--threads', type=int, help="TFLite interpreter threads (default: TFLite's choice)")
+    args = parser.parse_args()
+
+    # Same data and split as second_kaggle.py
+    X_all, _, _ = load_in_memory()
+    Y = pd.read_csv('train_info.csv').iloc[:, 1:].values
+    idx_train, idx_val, _, Y_val = train_test_split(np.arange(len(Y)), Y, test_size=0.2, random_state=SEED, shuffle=True)
+    X_train, X_val = X_all[idx_train], X_all[idx_val]
+    labels = {
+        'gender': (Y_val[:, 0].reshape(-1, 1), 1),
+        'experience': (tf.keras.utils.to_categorical(Y_val[:, 1], 3), 3),
+        'hand': (Y_val[:, 2].reshape(-1, 1), 1),
+        'level': (tf.keras.utils.to_categorical(Y_val[:, 3], 3), 3),
+    }
+
+    # (model name, {output: head}) for every saved model
+    saved = []
+    if os.path.exists(os.path.join(args.model_dir, "MultiTask_Model.keras")):
+        saved.append(("MultiTask_Model", {head: head for head in labels}))
+    for head, name in per_task_models.items():
+        if os.path.exists(os.path.join(args.model_dir, f"{name}.keras")):
+            saved.append((name, {None: head}))
+    if not saved:
+        raise SystemExit(f"No saved models in {args.model_dir}/; run second_kaggle.py first.")
+
+    def head_predictions(predictions, outputs):
+        return {head: predictions[output] if output is not None else predictions for output, head in outputs.items()}
+
+    print(f"\n{'model':<18} {'backend':<8} {'size (MB)':>10} {'batch ms/seq':>13} {'single ms':>10} "
+          f"{'max |dp|':>9} {'max dAUC':>9}  ROC-AUC per head")
+    for name, outputs in saved:
+        keras_path = os.path.join(args.model_dir, f"{name}.keras")
+        model = tf.keras.models.load_model(keras_path, compile=False)
+        if model.input_shape[1] is None:
+            print(f"{name:<18} skipped: trained with --bucketed (variable input length)")
+            continue
+        reference, batched, single = time_predict(lambda X: model.predict(X, batch_size=args.batch_size, verbose=0), X_val, args.batch_size)
+        reference = head_predictions(reference, outputs)
+        reference_auc = {head: task_auc(labels[head][0], p, labels[head][1]) for head, p in reference.items()}
+        auc_text = " ".join(f"{head}={auc:.4f}" for head, auc in reference_auc.items())
+        print(f"{name:<18} {'keras':<8} {os.path.getsize(keras_path) / 1e6:>10.2f} {batched * 1000:>13.3f} {single * 1000:>10.3f} "
+              f"{'':>9} {'':>9}  {auc_text}")
+
+        for mode in args.modes:
+            path = export_tflite(model, tflite_path(args.model_dir, name, mode), mode, X_train, args.samples)
+            tflite_model = TFLiteModel(path, args.threads)
+            predictions, batched, single = time_predict(lambda X: tflite_model.predict(X, args.batch_size), X_val, args.batch_size)
+            predictions = head_predictions(predictions, outputs)
+            aucs = {head: task_auc(labels[head][0], p, labels[head][1]) for head, p in predictions.items()}
+            max_dp = max(float(np.max(np.abs(predictions[head] - reference[head]))) for head in predictions)
+            max_dauc = max(abs(aucs[head] - reference_auc[head]) for head in aucs)
+            auc_text = " ".join(f"{head}={auc:.4f}" for head, auc in aucs.items())
+            print(f"{'':<18} {mode:<8} {os.path.getsize(path) / 1e6:>10.2f} {batched * 1000:>13.3f} {single * 1000:>10.3f} "
+                  f"{max_dp:>9.4f} {max_dauc:>9.4f}  {auc_text}")